@@ -0,0 +1,46 @@
+""" Checks that the Elo ratings model prices games identically whether it starts from its checkpoint or from the stored
+    ratings and goals tables. The stored state is brought up to date first, so that both estimators price the same state.
+    Run from the repository root:
+
+        python -m benchmarks.elo_checkpoint_consistency
+"""
+import numpy as np
+import pandas as pd
+from datetime import datetime, timedelta
+
+from data_services import SoccerwayFootballDataService
+from probability_estimators import EloRatingsProbabilityEstimator
+from utils import Logger
+
+def check_checkpoint_consistency(football_database, league_ids, start_date, end_date, pricing_methods=('window', 'poisson')):
+    EloRatingsProbabilityEstimator(football_database).update_data()
+
+    results = []
+    for pricing in pricing_methods:
+        from_checkpoint = EloRatingsProbabilityEstimator(football_database, pricing=pricing)
+        if not from_checkpoint.load_checkpoint():
+            raise ValueError('No checkpoint built on the current games data was found.')
+
+        # building the rating index first makes the estimator read the stored tables instead of the checkpoint
+        from_tables = EloRatingsProbabilityEstimator(football_database, pricing=pricing)
+        from_tables.rating_index
+
+        checkpoint_odds = from_checkpoint.estimate_odds(league_ids, start_date, end_date)
+        tables_odds = from_tables.estimate_odds(league_ids, start_date, end_date)
+
+        markets = [c for c in checkpoint_odds.columns if c not in ['date', 'home_team_id', 'away_team_id', 'league_id']]
+        differences = np.abs(checkpoint_odds[markets].values.astype('float64') - tables_odds[markets].values.astype('float64'))
+        results.append({'pricing': pricing,
+                        'games': len(checkpoint_odds),
+                        'max_abs_diff': differences.max() if differences.size > 0 else 0.})
+
+    return pd.DataFrame.from_dict(results)
+
+if __name__ == '__main__':
+    logger = Logger('elo_checkpoint_consistency.log')
+    football_database = SoccerwayFootballDataService(logger)
+    results = check_checkpoint_consistency(football_database, football_database.games.league_id.unique().tolist(),
+                                           datetime.now(), datetime.now() + timedelta(days=7))
+    print(results.to_string(index=False))
+    if (results.max_abs_diff > 0).any():
+        raise ValueError('Odds priced from the checkpoint differ from the odds priced from the stored tables.')
@@ -0,0 +1,80 @@
+""" Compares the two pricing methods of the Elo ratings model - the similar games window and the per league Poisson goal
+    models - on the games of the most recent season(s). Both are given the ratings the teams had before each held-out game
+    and only the games played before the held-out ones, and are scored on every market. Run from the repository root:
+
+        python -m benchmarks.elo_pricing_accuracy
+"""
+import time
+import numpy as np
+import pandas as pd
+
+from constants import ACCEPTED_GOALS
+from data_services import SoccerwayFootballDataService
+from probability_estimators import EloRatingsProbabilityEstimator
+from probability_estimators.rating_index import RatingHistoryIndex
+from probability_estimators.similar_games import SimilarGamesIndex, _market_indicators
+from probability_estimators.poisson_goals import PoissonGoalsModel
+from utils import Logger
+
+def benchmark_pricing_accuracy(estimator, holdout_seasons=1, use_form=True):
+    games = estimator.db.games.dropna(subset=['ft_home', 'ft_away', 'ht_home', 'ht_away'])
+    seasons = sorted(games.season.unique())
+    holdout = games[games.season.isin(seasons[-holdout_seasons:])]
+    goals_given_points = estimator.goals_given_points
+    history = goals_given_points[goals_given_points.date < holdout.date.min()]
+
+    # the points differences recorded with the games are taken after their form updates, so they would leak the results -
+    # both methods price the differences of the ratings before each game, as the estimator does
+    rating_index = RatingHistoryIndex(estimator.teams_elo_score)
+    home_positions = rating_index.lookup(holdout.home_team_id.values, holdout.date.values, strict=True)
+    away_positions = rating_index.lookup(holdout.away_team_id.values, holdout.date.values, strict=True)
+
+    rated = (home_positions >= 0)&(away_positions >= 0)
+    holdout, home_positions, away_positions = holdout[rated], home_positions[rated], away_positions[rated]
+
+    points_diffs = rating_index.ratings[home_positions] - rating_index.ratings[away_positions]
+    if use_form:
+        points_diffs = points_diffs + rating_index.home_delta[home_positions] - rating_index.away_delta[away_positions]
+    points_diffs = points_diffs.astype('float64')
+
+    outcomes = _market_indicators(*[holdout[c].values.astype('int64') for c in ['ft_home', 'ft_away', 'ht_home', 'ht_away']])
+    outcomes.update({f'under_{ng}': ~outcomes[f'over_{ng}'] for ng in ACCEPTED_GOALS})
+
+    window_index = SimilarGamesIndex(history)
+    start = time.perf_counter()
+    window_probabilities = window_index.probabilities(*window_index.windows(points_diffs, estimator.delta_points_diff))
+    window_seconds = time.perf_counter() - start
+
+    poisson_model = PoissonGoalsModel(history)
+    start = time.perf_counter()
+    poisson_probabilities = poisson_model.probabilities(holdout.league_id.values, points_diffs)
+    poisson_seconds = time.perf_counter() - start
+    # the first call also builds the leagues' tables of market probabilities
+    start = time.perf_counter()
+    poisson_model.probabilities(holdout.league_id.values, points_diffs)
+    poisson_warm_seconds = time.perf_counter() - start
+
+    results = []
+    for market, happened in outcomes.items():
+        happened = happened.astype('float64')
+        row = {'market': market, 'frequency': happened.mean()}
+        for method, probabilities in [('window', window_probabilities), ('poisson', poisson_probabilities)]:
+            p = np.clip(probabilities[market], 1e-15, 1 - 1e-15)
+            row[f'{method}_brier'] = np.mean((p - happened)**2)
+            row[f'{method}_log_loss'] = -np.mean(happened * np.log(p) + (1 - happened) * np.log(1 - p))
+        results.append(row)
+
+    results = pd.DataFrame.from_dict(results)
+    timings = pd.DataFrame([{'method': 'window', 'games': len(holdout), 'seconds': window_seconds},
+                            {'method': 'poisson', 'games': len(holdout), 'seconds': poisson_seconds},
+                            {'method': 'poisson (tables built)', 'games': len(holdout), 'seconds': poisson_warm_seconds}])
+    return results, timings
+
+if __name__ == '__main__':
+    logger = Logger('elo_pricing_accuracy.log')
+    estimator = EloRatingsProbabilityEstimator(SoccerwayFootballDataService(logger))
+    results, timings = benchmark_pricing_accuracy(estimator)
+
+    print(results.to_string(index=False))
+    print(results.drop(columns='market').mean().to_frame('mean').T.to_string(index=False))
+    print(timings.to_string(index=False))
@@ -0,0 +1,59 @@
+""" Measures what importing each public entry point costs - wall time, peak memory and which heavy dependencies
+    (TensorFlow, selenium, bs4, textdistance) get loaded. Every entry point is imported in a fresh interpreter, so the
+    numbers are not hidden by modules an earlier import already loaded. Run from the repository root:
+
+        python -m benchmarks.import_time
+"""
+import os
+import sys
+import json
+import subprocess
+import pandas as pd
+
+_ENTRY_POINTS = ['import probability_estimators',
+                 'from probability_estimators import EloRatingsProbabilityEstimator',
+                 'from probability_estimators import BookieAverageProbabilityEstimator',
+                 'from probability_estimators import RnnProbabilityEstimator',
+                 'import odds_providers',
+                 'from odds_providers import get_registered_providers',
+                 'from odds_providers import get_all_providers',
+                 'from data_services import SoccerwayFootballDataService']
+
+_HEAVY_MODULES = ['tensorflow', 'keras', 'selenium', 'bs4', 'textdistance']
+
+_PROBE = """
+import sys, time, json, resource
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds,
+                  'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  'loaded': [m for m in {heavy_modules!r} if m in sys.modules]}}))
+"""
+
+def benchmark_import_time(entry_points=_ENTRY_POINTS, repeats=3):
+    results = []
+    for statement in entry_points:
+        runs = []
+        for _ in range(repeats):
+            probe = _PROBE.format(statement=statement, heavy_modules=_HEAVY_MODULES)
+            output = subprocess.run([sys.executable, '-c', probe], cwd=os.getcwd(), capture_output=True, text=True)
+            if output.returncode != 0:
+                runs.append({'error': output.stderr.strip().splitlines()[-1]})
+                break
+            runs.append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+        if 'error' in runs[-1]:
+            results.append({'entry_point': statement, 'error': runs[-1]['error']})
+            continue
+
+        results.append({'entry_point': statement,
+                        'seconds': min(run['seconds'] for run in runs),
+                        'max_rss_mb': min(run['max_rss_mb'] for run in runs),
+                        'heavy_modules': ', '.join(runs[-1]['loaded']),
+                        'error': None})
+
+    return pd.DataFrame.from_dict(results)
+
+if __name__ == '__main__':
+    print(benchmark_import_time().to_string(index=False))
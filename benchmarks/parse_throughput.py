@@ -0,0 +1,49 @@
+""" Replays the page snapshots recorded with a RecordingDriver through every odds provider's parsing path and reports
+    the parse throughput per bookie. Run from the repository root:
+
+        python -m benchmarks.parse_throughput
+"""
+import time
+import pandas as pd
+
+from constants import SNAPSHOTS_PATH
+from data_services import SoccerwayFootballDataService
+from odds_providers import get_all_providers
+from replay_driver import ReplayDriver, recorded_league_ids
+from utils import Logger
+
+def benchmark_parse_throughput(football_database, snapshots_path=SNAPSHOTS_PATH, repeats=3, logger=None):
+    results = []
+    for provider_class in get_all_providers():
+        provider = provider_class(football_database, logger)
+        league_ids = recorded_league_ids(provider.name, snapshots_path)
+        if len(league_ids) == 0:
+            continue
+
+        # snapshots are replayed long after they were recorded - do not stop at games that are too far ahead of today
+        provider._max_game_days_ahead = float('inf')
+
+        driver = ReplayDriver(snapshots_path, logger)
+        provider.set_driver(driver)
+
+        n_games, elapsed = 0, 0.
+        for _ in range(repeats):
+            for league_id in league_ids:
+                start = time.perf_counter()
+                league_odds = provider.extract_league_odds(league_id, close_driver=False)
+                elapsed += time.perf_counter() - start
+                n_games += len(league_odds)
+
+        results.append({'bookie': provider.name,
+                        'leagues': len(league_ids),
+                        'games': n_games / repeats,
+                        'pages': driver.pages_replayed / repeats,
+                        'seconds': elapsed / repeats,
+                        'games_per_second': n_games / elapsed if elapsed > 0 else None,
+                        'pages_per_second': driver.pages_replayed / elapsed if elapsed > 0 else None})
+
+    return pd.DataFrame.from_dict(results)
+
+if __name__ == '__main__':
+    logger = Logger('parse_throughput.log')
+    print(benchmark_parse_throughput(SoccerwayFootballDataService(logger), logger=logger).to_string(index=False))
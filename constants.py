@@ -7,3 +7,6 @@ LEAGUES_CSV_PATH = DB_PATH + 'leagues.csv'
 TEAMS_CSV_PATH = DB_PATH + 'teams.csv'
 GAMES_BY_TEAM_CSV_PATH = DB_PATH + 'games_by_team.csv'
 BOOKIE_HEADERS_CSV_PATH = DB_PATH + 'bookie_headers.csv'
+SNAPSHOTS_PATH = DB_PATH + 'snapshots/'
+SCRAPE_METRICS_CSV_PATH = DB_PATH + 'scrape_metrics.csv'
+CIRCUIT_BREAKER_JSON_PATH = DB_PATH + 'circuit_breaker_{}.json'
@@ -5,37 +5,88 @@ from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as ec
 
-from utils import Logging, PageNotLoadingError
+from utils import Logging, PageNotLoadingError, CircuitOpenError, BackoffPolicy
 from constants import DRIVER_PATH
 
 class DriverWrapper:
-    def __init__(self, max_trials, trial_wait_time):
+    """ Base class of the driver wrappers. Failing commands are retried up to 'max_trials' times, waiting between trials
+        as set by 'backoff' (by default exponential, starting from half of 'trial_wait_time'). If a CircuitBreaker is set
+        as 'breaker', commands on selectors whose circuit is open fail at once, without any trials.
+    """
+    def __init__(self, max_trials, trial_wait_time, metrics=None, backoff=None, breaker=None):
         self.max_trials = max_trials
         self.trial_wait_time = trial_wait_time
+        self.metrics = metrics
+        self.backoff = backoff if backoff is not None else BackoffPolicy(trial_wait_time / 2, max_wait=trial_wait_time * 4)
+        self.breaker = breaker
+
+    def sleep(self, seconds):
+        start = time.perf_counter()
+        time.sleep(seconds)
+        self._record_metric('sleep', start)
+
+    def _retry_wait(self, trial):
+        time.sleep(self.backoff.wait_time(trial))
+
+    def _record_metric(self, operation, start, target=None, retries=0, failed=False):
+        if self.metrics is not None:
+            self.metrics.record_since(operation, start, target, retries, failed)
+
+    def _run_in_trials(self, operation, target, failure_error, command, *args, retry_on=Exception, max_trials=None, open_error=None):
+        """ Runs 'command' until it succeeds or 'max_trials' attempts fail (the wrapper's 'max_trials' if not given), in
+            which case the exception returned by 'failure_error' is raised. If the circuit of 'target' is open, the exception
+            returned by 'open_error' is raised at once - a CircuitOpenError if not given.
+        """
+        max_trials = self.max_trials if max_trials is None else max_trials
+        start = time.perf_counter()
+        if self.breaker is not None and self.breaker.is_open(target):
+            self._record_metric(operation, start, target, failed=True)
+            if open_error is not None:
+                raise open_error()
+            raise CircuitOpenError(f'Circuit open for {operation} on \"{target}\" - skipping it until its cooldown expires.')
+
+        for trial in range(max_trials):
+            try:
+                result = command(*args)
+                self._record_metric(operation, start, target, retries=trial)
+                if self.breaker is not None:
+                    self.breaker.record_success(target)
+                return result
+            except retry_on:
+                if trial < max_trials - 1:
+                    self._retry_wait(trial)
+
+        self._record_metric(operation, start, target, retries=max_trials, failed=True)
+        if self.breaker is not None:
+            self.breaker.record_failure(target)
+        raise failure_error()
 
     def _wrap_find_in_trials(self, find_method, element_to_find):
-        for trial in range(self.max_trials):
-            try:
-                element = find_method(element_to_find)
-                return element
-            except:
-                time.sleep(self.trial_wait_time)
+        return self._run_in_trials(find_method.__name__, element_to_find,
+                                   lambda: PageNotLoadingError(f'Driver could not find element {element_to_find}. ' +\
+                                                                'Either the element is not present, or the page has not loaded successfully.'),
+                                   find_method, element_to_find)
 
-        raise PageNotLoadingError(f'Driver could not find element {element_to_find}. ' +\
-                                   'Either the element is not present, or the page has not loaded successfully.')
+    def _wrap_element(self, element, selector):
+        return DriverElement(element, self.max_trials, self.trial_wait_time, self.metrics, selector, self.backoff, self.breaker)
+
+    def _wrap_element_group(self, elements, selector):
+        return DriverElementGroup(elements, self.max_trials, self.trial_wait_time, self.metrics, selector, self.backoff, self.breaker)
 
 
 class Driver(DriverWrapper):
     """ Wrapper for the Selenium webdriver. Used to avoid crashes when page has not yet fully loaded or a popup has appeared
         that is blocking an element. Instead of crashing, the Driver will make 'max_trials' attempts to complete the command
-        (e.g. to find an element by xpath or to click on a button)
+        (e.g. to find an element by xpath or to click on a button). If 'metrics' (a ScrapeMetrics instance) is given, the
+        duration, retries and failures of every command are recorded in it.
     """
     __executable_path = DRIVER_PATH
 
-    def __init__(self, logger=None, max_trials=3, trial_wait_time=4, driver_wait_time = 5):
-        super().__init__(max_trials, trial_wait_time)
+    def __init__(self, logger=None, max_trials=3, trial_wait_time=4, driver_wait_time = 5, metrics=None, backoff=None, breaker=None):
+        super().__init__(max_trials, trial_wait_time, metrics, backoff, breaker)
         self.logger = logger
         self.driver_wait_time = driver_wait_time
+        self.context = None
 
         self.__driver = webdriver.Firefox(executable_path=self.__executable_path)
         self.__driver.implicitly_wait(driver_wait_time)
@@ -44,78 +95,87 @@ class Driver(DriverWrapper):
     @property
     def page_source(self):
         #return self.__driver.page_source;
-        return self.__driver.find_element_by_tag_name('html').get_attribute('innerHTML')
+        start = time.perf_counter()
+        page_source = self.__driver.find_element_by_tag_name('html').get_attribute('innerHTML')
+        self._record_metric('page_source', start)
+        return page_source
 
     @property
     def current_url(self):
         return self.__driver.current_url;
     
-    def back(self): self.__driver.back();
+    def back(self): self.__timed('back', None, self.__driver.back);
     def start(self): self.__driver = webdriver.Firefox(executable_path=self.__executable_path);
     def close(self): self.__driver.close();
-    def get(self, url): self.__driver.get(url);
-    def refresh(self): self.__driver.refresh();
+    def get(self, url): self.__timed('get', url, self.__driver.get, url);
+    def refresh(self): self.__timed('refresh', None, self.__driver.refresh);
+
+    def set_context(self, bookie_name, league_id):
+        """ Marks the bookie and league that the following commands are scraping.
+        """
+        self.context = (bookie_name, league_id)
 
     def find_element_by_class_name(self, class_name):
-        return DriverElement(self._wrap_find_in_trials(self.__driver.find_element_by_class_name, class_name), self.max_trials, self.trial_wait_time)
+        return self._wrap_element(self._wrap_find_in_trials(self.__driver.find_element_by_class_name, class_name), class_name)
     def find_elements_by_class_name(self, class_name):
-        return DriverElementGroup(self._wrap_find_in_trials(self.__driver.find_elements_by_class_name, class_name), self.max_trials, self.trial_wait_time)
+        return self._wrap_element_group(self._wrap_find_in_trials(self.__driver.find_elements_by_class_name, class_name), class_name)
     def find_element_by_xpath(self, xpath):
-        return DriverElement(self._wrap_find_in_trials(self.__driver.find_element_by_xpath, xpath), self.max_trials, self.trial_wait_time)
+        return self._wrap_element(self._wrap_find_in_trials(self.__driver.find_element_by_xpath, xpath), xpath)
     def find_elements_by_xpath(self, xpath):
-        return DriverElementGroup(self._wrap_find_in_trials(self.__driver.find_elements_by_xpath, xpath), self.max_trials, self.trial_wait_time)
+        return self._wrap_element_group(self._wrap_find_in_trials(self.__driver.find_elements_by_xpath, xpath), xpath)
 
     def wait_until_visibility(self, by, content):
-        for trial in range(self.max_trials):
-            try:
-                self.__driver_waiter.until(ec.visibility_of_element_located((by, content)))
-                break
-            except TimeoutException:
-                time.sleep(self.trial_wait_time)
-                
-            error_msg = f'Could not find {by} \"{content}\" at page {self.current_url}'
-            if self.logger is not None:
-                self.logger.log_message(error_msg, Logging.ERROR)
-            raise TimeoutException(error_msg)
+        # providers use visibility waits to probe for optional elements, so a timeout is not retried - the waiter already
+        # waited 'driver_wait_time' - and only counts as a failure towards the circuit breaker. An open circuit fails the
+        # wait at once with the same TimeoutException, so probes catching it skip the element instead of the whole league
+        self._run_in_trials('wait_until_visibility', content, lambda: self.__visibility_error(by, content),
+                            self.__driver_waiter.until, ec.visibility_of_element_located((by, content)),
+                            retry_on=TimeoutException, max_trials=1, open_error=lambda: self.__visibility_error(by, content))
+
+    def __visibility_error(self, by, content):
+        error_msg = f'Could not find {by} \"{content}\" at page {self.current_url}'
+        if self.logger is not None:
+            self.logger.log_message(error_msg, Logging.ERROR)
+        return TimeoutException(error_msg)
+
+    def __timed(self, operation, target, command, *args):
+        start = time.perf_counter()
+        try:
+            command(*args)
+        except:
+            self._record_metric(operation, start, target, failed=True)
+            raise
+        self._record_metric(operation, start, target)
 
 class DriverElement(DriverWrapper):
-    """ Wrapper for Selenium driver elements.
+    """ Wrapper for Selenium driver elements. 'selector' is the class name or xpath the element was found by.
     """
-    def __init__(self, element, max_trials, trial_wait_time):
-        super().__init__(max_trials, trial_wait_time)
+    def __init__(self, element, max_trials, trial_wait_time, metrics=None, selector=None, backoff=None, breaker=None):
+        super().__init__(max_trials, trial_wait_time, metrics, backoff, breaker)
         self.__element = element
+        self.selector = selector
 
     def click(self):
-        for trial in range(self.max_trials):
-            try:
-                self.__element.click()
-                return
-            except:
-                time.sleep(self.trial_wait_time)
-
-        raise PageNotLoadingError('Cannot click element - something may be obstructing it.')
+        self._run_in_trials('click', self.selector, lambda: PageNotLoadingError('Cannot click element - something may be obstructing it.'),
+                            self.__element.click)
 
     def get_attribute(self, attribute): return self.__element.get_attribute(attribute);
 
     def find_element_by_class_name(self, class_name):
-        element = self._wrap_find_in_trials(self.__element.find_element_by_class_name, class_name)
-        return DriverElement(element, self.max_trials, self.trial_wait_time)
+        return self._wrap_element(self._wrap_find_in_trials(self.__element.find_element_by_class_name, class_name), class_name)
     def find_elements_by_class_name(self, class_name):
-        element = self._wrap_find_in_trials(self.__element.find_elements_by_class_name, class_name)
-        return DriverElementGroup(element, self.max_trials, self.trial_wait_time)
+        return self._wrap_element_group(self._wrap_find_in_trials(self.__element.find_elements_by_class_name, class_name), class_name)
     def find_element_by_xpath(self, xpath):
-        element = self._wrap_find_in_trials(self.__element.find_element_by_xpath, xpath)
-        return DriverElement(element, self.max_trials, self.trial_wait_time)
+        return self._wrap_element(self._wrap_find_in_trials(self.__element.find_element_by_xpath, xpath), xpath)
     def find_elements_by_xpath(self, xpath):
-        element = self._wrap_find_in_trials(self.__element.find_elements_by_xpath, xpath)
-        return DriverElementGroup(element, self.max_trials, self.trial_wait_time)
+        return self._wrap_element_group(self._wrap_find_in_trials(self.__element.find_elements_by_xpath, xpath), xpath)
 
 class DriverElementGroup(DriverWrapper):
     """ Wrapper for a collection of selenium driver elements. For example, when calling driver.find_elements_by_xpath
     """
-    def __init__(self, elements, max_trials, trial_wait_time):
-        super().__init__(max_trials, trial_wait_time)
-        self.__elements = [DriverElement(element, max_trials, trial_wait_time) for element in elements]
+    def __init__(self, elements, max_trials, trial_wait_time, metrics=None, selector=None, backoff=None, breaker=None):
+        super().__init__(max_trials, trial_wait_time, metrics, backoff, breaker)
+        self.__elements = [self._wrap_element(element, selector) for element in elements]
 
     def __getitem__(self, key):
         return self.__elements[key]
@@ -128,4 +188,3 @@ class DriverElementGroup(DriverWrapper):
 
     def __len__(self):
         return len(self.__elements)
-
@@ -1,5 +1,16 @@
-from .bet365 import Bet365OddsProvider
-from .bwin import BwinOddsProvider
-from .coral import CoralOddsProvider
-from .efbet import EfbetOddsProvider
-from .odds_provider import get_all_providers
\ No newline at end of file
+from utils import lazy_exports
+
+# providers are imported on first use, together with selenium, bs4 and textdistance
+_EXPORTS = {'Bet365OddsProvider': '.bet365',
+            'BwinOddsProvider': '.bwin',
+            'CoralOddsProvider': '.coral',
+            'EfbetOddsProvider': '.efbet',
+            'get_all_providers': '.odds_provider',
+            'ProviderInfo': '.registry',
+            'PROVIDER_REGISTRY': '.registry',
+            'get_provider_info': '.registry',
+            'get_registered_providers': '.registry',
+            'OddsUpdateOrchestrator': '.orchestrator'}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
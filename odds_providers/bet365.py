@@ -1,6 +1,5 @@
 import numpy as np
 #import pandas as pd
-import time
 from datetime import datetime
 from bs4 import BeautifulSoup
 
@@ -39,12 +38,12 @@ class Bet365OddsProvider(OddsProvider):
         stats_class_name = 'sl-CouponFixtureLinkParticipant_Name'
         outer_stats_class_name = 'sl-MarketCouponFixtureLink'
         self._driver.wait_until_visibility(By.CLASS_NAME, stats_class_name)
-        time.sleep(3)
+        self._driver.sleep(3)
 
         stats_list = self._driver.find_element_by_class_name(outer_stats_class_name).find_elements_by_class_name(stats_class_name)
         stats_list[odds_item].click()
 
-        time.sleep(3)
+        self._driver.sleep(3)
 
         try:
              self._driver.wait_until_visibility(By.XPATH, f'.//div[contains(@class, \'{self.__odds_group_class}\') and text()=\'{self._bookie_headers[FULL_TIME]}\']')
@@ -66,7 +65,7 @@ class Bet365OddsProvider(OddsProvider):
         game_dict = {}
         
         game_dict = self.__extract_main_odds(self._driver.page_source, game_dict=game_dict)
-        time.sleep(np.random.randint(2, 5, (1,))[0])
+        self._driver.sleep(np.random.randint(2, 5, (1,))[0])
 
         if game_dict is None:
             return game_dict
@@ -79,7 +78,7 @@ class Bet365OddsProvider(OddsProvider):
             pass
 
         game_dict = self.__extract_goals_odds(self._driver.page_source, game_dict)
-        time.sleep(np.random.randint(2, 5, (1,))[0])
+        self._driver.sleep(np.random.randint(2, 5, (1,))[0])
 
         self._driver.get(self._driver.current_url.replace('I6', 'I7'))
 
@@ -93,9 +92,9 @@ class Bet365OddsProvider(OddsProvider):
         if close_driver:
             self._close_driver()
         else:
-            self._driver.back(); time.sleep(1);
-            self._driver.back(); time.sleep(1);
-            self._driver.back(); time.sleep(np.random.randint(1, 4, (1,))[0])
+            self._driver.back(); self._driver.sleep(1);
+            self._driver.back(); self._driver.sleep(1);
+            self._driver.back(); self._driver.sleep(np.random.randint(1, 4, (1,))[0])
             
         return game_dict
 
@@ -110,7 +109,7 @@ class Bet365OddsProvider(OddsProvider):
             language_btn.find_element_by_xpath('.//a[contains(@class, \'hm-DropDownSelections_Item\') and text()=\'English\']').click()
 
     def _get_league_url(self, league_id):
-        time.sleep(10)
+        self._driver.sleep(10)
         return super()._get_league_url(league_id)
         
     def __extract_main_odds(self, main_match_html, game_dict = {}):
@@ -1,6 +1,5 @@
 #import numpy as np
 #import pandas as pd
-import time
 from datetime import datetime
 from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
@@ -150,7 +149,7 @@ class BwinOddsProvider(OddsProvider):
         game_dict['away_team_id'] = self._get_team_id(game_dict['away_team'], league_id)
         game_dict.pop('home_team', None); game_dict.pop('away_team', None)
             
-        time.sleep(2)
+        self._driver.sleep(2)
         return game_dict
 
         
@@ -174,7 +173,7 @@ class BwinOddsProvider(OddsProvider):
             game_dict.pop('home_team', None); game_dict.pop('away_team', None)
             
             games_odds.append(game_dict)
-            time.sleep(2)
+            self._driver.sleep(2)
 
         return games_odds
 
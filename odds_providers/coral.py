@@ -1,6 +1,5 @@
 #import numpy as np
 #import pandas as pd
-import time
 from datetime import datetime
 from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
@@ -33,7 +32,7 @@ class CoralOddsProvider(OddsProvider):
         self.__find_name = lambda x: x.find('span', {'data-crlat': 'outcomeEntity.name'}).text
 
     def _get_odds_link_items(self):
-        time.sleep(5)
+        self._driver.sleep(5)
 
         bs = BeautifulSoup(self._driver.page_source, 'html.parser')
         odds_links = [self._HOME_URL + link.attrs['href'] + '/all-markets' for link in bs.findAll('a', {'class': 'odds-more-link'})]
@@ -45,20 +44,20 @@ class CoralOddsProvider(OddsProvider):
 
         self._driver.wait_until_visibility(By.XPATH, './/span[contains(@data-crlat, \'eventEntity.filteredTime\')]')
 
-        time.sleep(2)
+        self._driver.sleep(2)
         for idx in range(3):
             try:
                 date_str = BeautifulSoup(self._driver.page_source, 'html.parser').find('span', {'data-crlat': 'eventEntity.filteredTime'}).text.split()[1].replace('.', '')
                 break
             except:
-                time.sleep(6)
+                self._driver.sleep(6)
 
         date = datetime.strptime(date_str, '%d-%b-%y')
 
         if (date - datetime.now()).days >= self._max_game_days_ahead:
             return None
 
-        time.sleep(1)
+        self._driver.sleep(1)
 
         self._driver.wait_until_visibility(By.XPATH, f'//accordion[contains(., \'{self._bookie_headers[FULL_TIME]}\')]')
 
@@ -66,7 +65,7 @@ class CoralOddsProvider(OddsProvider):
         list_openers = self._driver.find_elements_by_xpath(groups_xpath)
         for opener in list_openers:
             opener.find_element_by_xpath('.//header').click()
-            time.sleep(2)
+            self._driver.sleep(2)
 
         match_html = self._driver.page_source
         group_wrappers = self.__get_html_market_groups(match_html)
@@ -1,6 +1,5 @@
 #import numpy as np
 #import pandas as pd
-import time
 from datetime import datetime
 from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
@@ -72,9 +71,9 @@ class EfbetOddsProvider(OddsProvider):
         stats_list[odds_item].click()
 
         self._driver.wait_until_visibility(By.XPATH, './/a[text()=\'All\']')
-        time.sleep(3)
+        self._driver.sleep(3)
         self._driver.refresh()
-        time.sleep(3)
+        self._driver.sleep(3)
 
         self._driver.find_element_by_xpath('.//a[text()=\'All\']').click()
 
@@ -82,7 +81,7 @@ class EfbetOddsProvider(OddsProvider):
         list_openers = self._driver.find_elements_by_xpath(groups_string)
         for opener in list_openers:
             opener.click()
-            time.sleep(1)
+            self._driver.sleep(1)
         
         match_html = self._driver.page_source
         group_wrappers = self.__get_html_market_groups(match_html)
@@ -185,7 +184,7 @@ class EfbetOddsProvider(OddsProvider):
 
     def _get_league_url(self, league_id):
         # needs a little timeout, otherwise a nasty bug appears occasionally, mixing up the different leagues
-        time.sleep(30)
+        self._driver.sleep(30)
 
         if league_id not in self._league_codes or self._league_codes[league_id] is None:
             return None
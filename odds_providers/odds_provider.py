@@ -2,29 +2,19 @@
 import pandas as pd
 from datetime import datetime
 import time
-import sys
-import inspect
 
 from textdistance import hamming, jaro_winkler, cosine
 
 
 from driver import Driver
-from constants import ACCEPTED_GOALS, DB_PATH, BOOKIE_HEADERS_CSV_PATH
-from utils import OddsExtractionFailedError, Logging
+from constants import ACCEPTED_GOALS, SCRAPE_METRICS_CSV_PATH, CIRCUIT_BREAKER_JSON_PATH
+from utils import OddsExtractionFailedError, CircuitOpenError, Logging, ScrapeMetrics, BackoffPolicy, CircuitBreaker
 from utils.odds_columns import get_all_odds_columns
 from utils.match_columns import get_all_match_columns
-
-_BOOKIE_LEAGUE_URLS = {
-    'bet365': 'https://www.bet365.com/#/AC/B1/C1/D13/{}/F2/',
-    'bwin': 'https://sports.bwin.com/en/sports#leagueIds={}&sportId=4',
-    'coral': 'https://sports.coral.co.uk/competitions/football/football-{}/{}',
-    'efbet': 'https://www.efbet.com/UK/sports#bo-navigation=282241.1,{},{}&action=market-group-list'
-}
+from .registry import get_provider_info, get_registered_providers
 
 def get_all_providers():
-    module = sys.modules[globals()['__name__'].split('.')[0]]
-    odds_provider_names = [n[0] for n in inspect.getmembers(module, inspect.isclass)]
-    return [p for p in [getattr(module, pn) for pn in odds_provider_names] if issubclass(p, OddsProvider)]
+    return [info.provider_class() for info in get_registered_providers()]
 
 class OddsProvider:
     """Abstract odds provider class.
@@ -37,24 +27,26 @@ class OddsProvider:
         self.trial_wait_time = trial_wait_time
 
         self._bookie_name = type(self).__name__.replace('OddsProvider', '').lower()
-        if self._bookie_name not in _BOOKIE_LEAGUE_URLS:
-            raise ValueError(f'No league url listed for bookmaker {self._bookie_name}')
+        self.info = get_provider_info(self._bookie_name)
 
-        self._league_url = _BOOKIE_LEAGUE_URLS[self._bookie_name]
+        self._league_url = self.info.league_url
 
-        self._ODDS_CSV_PATH = DB_PATH + 'odds_{}.csv'.format(self._bookie_name)
+        self._ODDS_CSV_PATH = self.info.odds_csv_path
         self._odds = None
 
-        self._teams_quick_map = pd.read_csv(DB_PATH + 'teams_quick_map_' + self._bookie_name + '.csv')
+        self._teams_quick_map = pd.read_csv(self.info.teams_quick_map_csv_path)
         self._teams_quick_map = {k: int(v) for k, v in self._teams_quick_map[['bookie_team_name', 'team_id']].values}
 
-        self._league_codes = pd.read_csv(DB_PATH + 'league_codes_' + self._bookie_name + '.csv')
+        self._league_codes = pd.read_csv(self.info.league_codes_csv_path)
         self._league_codes = {k: v for k, v in self._league_codes[['league_id', 'league_code']].values}
 
-        self.__load_headers()
+        self._bookie_headers = self.info.bookie_headers()
 
         self._driver = None
         self.__driver_started = False
+        self.metrics = ScrapeMetrics()
+        self.backoff = BackoffPolicy(trial_wait_time / 2, max_wait=trial_wait_time * 4)
+        self.breaker = CircuitBreaker(CIRCUIT_BREAKER_JSON_PATH.format(self._bookie_name), failure_threshold=max_trials)
 
         self._max_game_days_ahead = 7
 
@@ -77,6 +69,8 @@ class OddsProvider:
 
     def set_driver(self, driver):
         self._driver = driver
+        self._driver.metrics = self.metrics
+        self._driver.breaker = self.breaker
         self.__driver_started = True
 
     def provide_odds(self, league_ids, start_date, end_date):
@@ -89,10 +83,28 @@ class OddsProvider:
                                how='inner')
 
     def update_odds_db(self, max_game_days_ahead = 7):
+        new_odds = self.scrape_odds(max_game_days_ahead)
+
+        self.metrics.save(SCRAPE_METRICS_CSV_PATH)
+        self.metrics.reset()
+
+        self.merge_odds(new_odds)
+
+    def scrape_odds(self, max_game_days_ahead = 7):
+        """ Extracts the odds of upcoming games in all leagues, without saving them to the odds database.
+        """
         self._max_game_days_ahead = max_game_days_ahead
 
         new_odds = pd.DataFrame([])
         for idx in range(len(self.db.leagues)):
+            # leagues whose last 'max_trials' attempts failed - within this run or across runs - are skipped until their
+            # circuit cooldown expires
+            self.breaker.set_context(self.name, idx)
+            if self.breaker.is_open():
+                if self.logger is not None:
+                    self.logger.log_message(f'Circuit open for league with id {idx} - skipping it.', Logging.WARNING)
+                continue
+
             try:
                 league_odds = self.extract_league_odds(idx, close_driver=False)
 
@@ -101,33 +113,53 @@ class OddsProvider:
                     self.logger.log_message(f'Provider {self.name} could not find odds for columns {data_columns}', Logging.WARNING)
 
                 new_odds = new_odds.append(league_odds, ignore_index=True)
+                self.breaker.record_success()
             except Exception as exc:
+                # failed match attempts are already counted - an open circuit means the league failed on them
+                if not self.breaker.is_open():
+                    self.breaker.record_failure()
                 if self.logger is not None:
                     self.logger.log_message(str(exc), Logging.ERROR)
                     self.logger.log_message(f'Odds for league with id {idx} failed to be updated.', Logging.ERROR)
 
         self._close_driver()
+        self.breaker.save()
         if self.logger is not None:
+            self.metrics.log(self.logger)
             self.logger.add_newline()
 
+        return new_odds
+
+    def merge_odds(self, new_odds):
+        """ Saves 'new_odds' to the odds database, replacing any previously stored odds for the same games.
+        """
+        if len(new_odds) == 0:
+            return
+
         existing_odds_idxs = self.odds.reset_index()[['home_team_id', 'away_team_id', 'date', 'index']]\
                                       .merge(new_odds[['home_team_id', 'away_team_id', 'date']],
                                              on=['home_team_id', 'away_team_id', 'date'])['index'].tolist()
             
         odds = self.odds.drop(existing_odds_idxs, axis=0).append(new_odds, ignore_index=True)
         odds.to_csv(self._ODDS_CSV_PATH, index_label=False)
+        self._odds = None
 
     def extract_league_odds(self, league_id, close_driver = True):
         if self._driver is None:
             if self.logger is not None:
                 self.logger.log_message('No driver was explicitly set. Reverting to default webdriver', Logging.INFO)
-            self.set_driver(Driver(logger=self.logger))
+            self.set_driver(Driver(logger=self.logger, metrics=self.metrics))
 
         if not self.__driver_started:
             self._start_driver()
 
+        start = time.perf_counter()
+        self.metrics.set_context(self.name, league_id)
+        self.breaker.set_context(self.name, league_id)
+        self._driver.set_context(self.name, league_id)
         self._open_league_url(league_id, close_driver)
         games_odds = self.__extract_bookie_league_odds(league_id)
+        self.metrics.record_since('extract_league_odds', start)
 
         if close_driver:
             self._close_driver()
@@ -145,7 +177,7 @@ class OddsProvider:
         if self._driver is None:
             if self.logger is not None:
                 self.logger.log_message('No driver was explicitly set. Reverting to default webdriver', Logging.INFO)
-            self.set_driver(Driver(logger=self.logger))
+            self.set_driver(Driver(logger=self.logger, metrics=self.metrics))
 
         if not self.__driver_started:
             self._start_driver()
@@ -167,7 +199,7 @@ class OddsProvider:
                 self.logger.log_message(error_msg, Logging.INFO)
             raise ValueError(error_msg)
         
-        time.sleep(4)
+        self._driver.sleep(4)
 
     def _get_team_id(self, team_name, league_id):
         country = self.db.leagues.loc[league_id, 'country']
@@ -206,13 +238,17 @@ class OddsProvider:
         return self.LEAGUE_URL.format(league_code)
 
     def __extract_bookie_league_odds(self, league_id):
+        start = time.perf_counter()
         odds_generator = self._get_odds_link_items()
+        self.metrics.record_since('get_odds_link_items', start)
 
         games_odds = []
         for odds_item in odds_generator:
             for trial in range(self.max_trials):
                 try:
+                    start = time.perf_counter()
                     game_dict = self.extract_match_odds(odds_item, False)
+                    self.metrics.record_since('extract_match_odds', start, retries=trial)
 
                     # extract_match_odds would only return None if it's parsed through all the games within the set self._max_game_days_ahead
                     # therefore, we are done with this league
@@ -228,10 +264,19 @@ class OddsProvider:
                     game_dict.pop('home_team', None); game_dict.pop('away_team', None)
 
                     games_odds.append(game_dict)
+                    self.breaker.record_success()
                     break
+                except CircuitOpenError:
+                    raise
                 except:
+                    self.metrics.record_since('extract_match_odds', start, retries=trial, failed=True)
+                    # every failed attempt counts towards the league's circuit, so a league that keeps failing is given up
+                    # within the run instead of after 'max_trials' failed runs
+                    self.breaker.record_failure()
+                    if self.breaker.is_open():
+                        raise CircuitOpenError(f'Circuit open for league with id {league_id} - its last {self.max_trials} match attempts failed.')
                     self._driver.back()
-                    time.sleep(self.trial_wait_time)
+                    self._driver.sleep(self.backoff.wait_time(trial))
                     continue
             
                 # if league odds were extracted successfully - the loop should break before reaching this exception
@@ -242,11 +287,5 @@ class OddsProvider:
 
         return games_odds
 
-    def __load_headers(self):
-        bookie_headers = pd.read_csv(BOOKIE_HEADERS_CSV_PATH)
-        self._bookie_headers = bookie_headers[bookie_headers.BOOKIE_NAME == self._bookie_name]\
-                                                        .drop('BOOKIE_NAME', axis=1)\
-                                                        .to_dict(orient='records')[0]
-
 
 
@@ -0,0 +1,59 @@
+import pandas as pd
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from constants import SCRAPE_METRICS_CSV_PATH
+from utils import Logging
+from .odds_provider import get_all_providers
+
+def _scrape_provider_odds(provider_class, football_database, logger, max_game_days_ahead):
+    start = time.perf_counter()
+    provider = provider_class(football_database, logger)
+    new_odds = provider.scrape_odds(max_game_days_ahead)
+
+    return new_odds, provider.metrics, time.perf_counter() - start
+
+class OddsUpdateOrchestrator:
+    """ Updates the odds databases of several odds providers at once. Every provider scrapes in its own process (and
+        therefore with its own browser), so a full update takes as long as the slowest bookie rather than the sum of all
+        of them. The scraped odds are merged into each provider's odds database by the calling process.
+
+        Parameters:
+            'football_database' - Database of football games passed to every provider.
+            'providers'         - Odds provider classes to run. Defaults to all providers from get_all_providers().
+    """
+    def __init__(self, football_database, logger=None, providers=None):
+        self.db = football_database
+        self.logger = logger
+        self.providers = get_all_providers() if providers is None else providers
+
+    def update_odds_db(self, max_game_days_ahead=7):
+        """ Returns a report with the success, number of games scraped and latency (in seconds) of every provider.
+        """
+        report = []
+        with ProcessPoolExecutor(max_workers=len(self.providers)) as executor:
+            futures = {executor.submit(_scrape_provider_odds, provider_class, self.db, self.logger, max_game_days_ahead): provider_class\
+                            for provider_class in self.providers}
+
+            for future in as_completed(futures):
+                provider_class = futures[future]
+                bookie_name = provider_class.__name__.replace('OddsProvider', '').lower()
+                try:
+                    new_odds, metrics, latency = future.result()
+
+                    provider_class(self.db, self.logger).merge_odds(new_odds)
+                    metrics.save(SCRAPE_METRICS_CSV_PATH)
+                    report.append({'bookie': bookie_name, 'success': True, 'games': len(new_odds), 'latency': latency, 'error': None})
+                except Exception as exc:
+                    report.append({'bookie': bookie_name, 'success': False, 'games': 0, 'latency': None, 'error': str(exc)})
+
+        report = pd.DataFrame.from_dict(report)
+        if self.logger is not None:
+            for _, bookie_report in report.iterrows():
+                if bookie_report.success:
+                    self.logger.log_message(f'Provider {bookie_report.bookie} updated odds for {bookie_report.games} games ' +\
+                                            f'in {bookie_report.latency:.1f} seconds.', Logging.INFO)
+                else:
+                    self.logger.log_message(f'Provider {bookie_report.bookie} failed to update odds: {bookie_report.error}', Logging.ERROR)
+
+        return report
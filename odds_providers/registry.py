@@ -0,0 +1,47 @@
+import importlib
+import pandas as pd
+from collections import namedtuple
+
+from constants import DB_PATH, BOOKIE_HEADERS_CSV_PATH
+
+_bookie_headers = None
+
+class ProviderInfo(namedtuple('ProviderInfo', ['name', 'module', 'class_name', 'league_url', 'odds_csv_path',
+                                               'teams_quick_map_csv_path', 'league_codes_csv_path'])):
+    """ Static metadata of an odds provider, available without constructing (or importing) the provider itself.
+    """
+    def provider_class(self):
+        return getattr(importlib.import_module(self.module), self.class_name)
+
+    def bookie_headers(self):
+        """ Titles the bookie uses for each market header (see utils.bookie_header_titles). The headers table is read
+            once per process and shared by all providers.
+        """
+        global _bookie_headers
+        if _bookie_headers is None:
+            _bookie_headers = pd.read_csv(BOOKIE_HEADERS_CSV_PATH).set_index('BOOKIE_NAME').to_dict(orient='index')
+        return dict(_bookie_headers[self.name])
+
+def _provider_info(name, class_name, league_url):
+    return ProviderInfo(name=name,
+                        module=f'odds_providers.{name}',
+                        class_name=class_name,
+                        league_url=league_url,
+                        odds_csv_path=DB_PATH + f'odds_{name}.csv',
+                        teams_quick_map_csv_path=DB_PATH + f'teams_quick_map_{name}.csv',
+                        league_codes_csv_path=DB_PATH + f'league_codes_{name}.csv')
+
+PROVIDER_REGISTRY = {info.name: info for info in [
+    _provider_info('bet365', 'Bet365OddsProvider', 'https://www.bet365.com/#/AC/B1/C1/D13/{}/F2/'),
+    _provider_info('bwin', 'BwinOddsProvider', 'https://sports.bwin.com/en/sports#leagueIds={}&sportId=4'),
+    _provider_info('coral', 'CoralOddsProvider', 'https://sports.coral.co.uk/competitions/football/football-{}/{}'),
+    _provider_info('efbet', 'EfbetOddsProvider', 'https://www.efbet.com/UK/sports#bo-navigation=282241.1,{},{}&action=market-group-list')
+]}
+
+def get_provider_info(bookie_name):
+    if bookie_name not in PROVIDER_REGISTRY:
+        raise ValueError(f'No league url listed for bookmaker {bookie_name}')
+    return PROVIDER_REGISTRY[bookie_name]
+
+def get_registered_providers():
+    return list(PROVIDER_REGISTRY.values())
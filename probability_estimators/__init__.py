@@ -1,3 +1,10 @@
-from .rnn import RnnProbabilityEstimator
-from .elo_ratings import EloRatingsProbabilityEstimator
-from .bookie_average import BookieAverageProbabilityEstimator
+from utils import lazy_exports
+
+# estimators are imported on first use - the RNN estimator alone pulls in TensorFlow
+_EXPORTS = {'RnnProbabilityEstimator': '.rnn',
+            'EloRatingsProbabilityEstimator': '.elo_ratings',
+            'BookieAverageProbabilityEstimator': '.bookie_average',
+            'EloParameterSweep': '.elo_sweep'}
+
+__all__ = list(_EXPORTS)
+__getattr__, __dir__ = lazy_exports(__name__, _EXPORTS)
@@ -3,9 +3,7 @@ import pandas as pd
 from datetime import datetime
 import warnings
 
-from constants import DB_PATH
-from data_services import SoccerwayFootballDataService
-from odds_providers import get_all_providers
+from odds_providers import get_registered_providers
 from utils import odds_to_probabilities
 from utils.match_columns import get_all_match_columns
 from utils.odds_columns import get_all_odds_columns
@@ -30,8 +28,6 @@ class BookieAverageProbabilityEstimator:
                probability of draw     = 1/(3.40*1.073)
                probability of home win = 1/(1.85*1.073), which now sum to 1.
     """
-    _BOOKIE_CSV_NAME_FORMAT = DB_PATH + 'odds_{}.csv'
-    
     def __init__(self, football_database):
         self.db = football_database
 
@@ -61,10 +57,8 @@ class BookieAverageProbabilityEstimator:
 
     def __load_bookie_odds(self):
         self.bookies = {}
-        for bookie in get_all_providers():
-            bookie_name = bookie(self.db).name
-
-            self.bookies[bookie_name] = pd.read_csv(self._BOOKIE_CSV_NAME_FORMAT.format(bookie_name))
-            self.bookies[bookie_name]['date'] = pd.to_datetime(self.bookies[bookie_name]['date'])
+        for info in get_registered_providers():
+            self.bookies[info.name] = pd.read_csv(info.odds_csv_path)
+            self.bookies[info.name]['date'] = pd.to_datetime(self.bookies[info.name]['date'])
 
         self.__bookie_odds_loaded = True
\ No newline at end of file
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from .rating_index import RatingHistoryIndex
+from .similar_games import SimilarGamesIndex
+from .poisson_goals import PoissonGoalsModel
+
+class EloCheckpoint:
+    """Compact binary snapshot of the live state of the Elo ratings model - the latest rating and form of every team, the
+       current season's form counters, the similar games index and the version of the games data it was built on. Loading
+       it takes a single read of a numpy archive, so a process that only makes predictions can start without loading the
+       full ratings and goals history.
+
+       Parameters:
+           'rating_index'        - RatingHistoryIndex of the ratings (only the latest entry of each team is kept).
+           'teams_form'          - Current form table (team_id, home_delta, away_delta, home_t, away_t).
+           'similar_games_index' - SimilarGamesIndex over the goals given points table.
+           'data_version'        - Number of games and last game date per league the state was built on.
+           'poisson_goals_model' - Optional PoissonGoalsModel fitted on the goals given points table.
+    """
+    def __init__(self, rating_index, teams_form, similar_games_index, data_version, poisson_goals_model=None):
+        self.rating_index = rating_index.latest_index()
+        self.teams_form = teams_form
+        self.similar_games_index = similar_games_index
+        self.data_version = data_version
+        self.poisson_goals_model = poisson_goals_model
+
+    @property
+    def last_rating_date(self):
+        return self.rating_index.dates.max() if len(self.rating_index) > 0 else None
+
+    def save(self, filepath):
+        arrays = {f'ratings_{name}': values for name, values in self.rating_index.to_arrays().items()}
+        arrays.update({f'form_{c}': self.teams_form[c].values for c in self.teams_form.columns})
+        arrays.update({f'games_{name}': values for name, values in self.similar_games_index.to_arrays().items()})
+        arrays.update({f'version_{c}': self.data_version[c].values for c in self.data_version.columns})
+        if self.poisson_goals_model is not None:
+            arrays.update({f'poisson_{name}': values for name, values in self.poisson_goals_model.to_arrays().items()})
+
+        # write through a file object, so that numpy does not append its own extension to the path
+        with open(filepath, 'wb') as fp:
+            np.savez(fp, **arrays)
+
+    @classmethod
+    def load(cls, filepath):
+        with np.load(filepath) as archive:
+            arrays = {name: archive[name] for name in archive.files}
+
+        def table(prefix):
+            return pd.DataFrame({name[len(prefix):]: values for name, values in arrays.items() if name.startswith(prefix)})
+
+        checkpoint = cls.__new__(cls)
+        checkpoint.rating_index = RatingHistoryIndex.from_arrays({name[len('ratings_'):]: values for name, values in arrays.items()\
+                                                                    if name.startswith('ratings_')})
+        checkpoint.teams_form = table('form_')
+        checkpoint.similar_games_index = SimilarGamesIndex.from_arrays({name[len('games_'):]: values for name, values in arrays.items()\
+                                                                          if name.startswith('games_')})
+        checkpoint.data_version = table('version_')
+
+        poisson_arrays = {name[len('poisson_'):]: values for name, values in arrays.items() if name.startswith('poisson_')}
+        checkpoint.poisson_goals_model = PoissonGoalsModel.from_arrays(poisson_arrays) if len(poisson_arrays) > 0 else None
+        return checkpoint
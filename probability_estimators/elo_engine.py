@@ -0,0 +1,250 @@
+import numpy as np
+import pandas as pd
+from datetime import datetime
+
+def season_start_date(season):
+    return datetime(int(season / 1e4), 7, 1)
+
+def season_starting_ratings(games, season, leagues_init_points, latest_ratings):
+    """ Returns the team id, league id and starting rating of every team playing in 'season'. Teams that stayed in the
+        league they played in the previous season keep their latest rating, all others start with the league's
+        starting points.
+
+        Parameters:
+            'games'               - Table of games, including those of 'season' and the season before it.
+            'leagues_init_points' - Starting points of every league, as a Series indexed by league id.
+            'latest_ratings'      - Latest rating of every team, as a Series indexed by team id.
+    """
+    season_games = games[games.season == season]
+    team_ids = np.unique(season_games[['home_team_id', 'away_team_id']].values)
+
+    # a team's league in a season is the league of its first home game in the games table
+    league_this_season = season_games.drop_duplicates('home_team_id').set_index('home_team_id')['league_id'].reindex(team_ids)
+    last_season_games = games[games.season == season - 10001]
+    league_last_season = last_season_games.drop_duplicates('home_team_id').set_index('home_team_id')['league_id'].reindex(team_ids)
+
+    stayed_in_league = (league_last_season.values == league_this_season.values)
+    starting_ratings = np.where(stayed_in_league,
+                                latest_ratings.reindex(team_ids).values.astype('float64'),
+                                leagues_init_points.reindex(league_this_season.values).values.astype('float64'))
+
+    return pd.DataFrame({'team_id': team_ids,
+                         'league_id': league_this_season.values,
+                         'elo_rating': starting_ratings})
+
+def _update_engine(engine, games, rounds_to_calibrate):
+    engine.update(games, rounds_to_calibrate)
+    return engine
+
+class EloUpdateEngine:
+    """Array-backed implementation of the Elo ratings and form updates of EloRatingsProbabilityEstimator. Ratings, home/away
+       form deltas and game counters are kept in NumPy arrays indexed by a dense team index, and the league parameters are
+       preloaded into arrays indexed by league id, so updating a game is plain scalar arithmetic instead of table lookups.
+       The ratings history and goals given points rows are collected column-wise and returned in bulk by flush().
+
+       Ratings which are still the float16 values loaded from the ratings csv are subtracted in half precision, exactly as
+       when they are read from the float16 ratings column, so the results match the ratings history already stored.
+
+       Parameters:
+           'leagues_margins'             - Table with the expected advantage, margin intercept and margin coefficient per league.
+           'margin_exp_value_given_sign' - Table with the expected goals margin of home ('1') and away ('2') wins per league.
+           'form_lr'                     - Coefficient of the exponentially weighted average of the teams' form.
+           'k'                           - Elo K-factor.
+
+       Example:
+           engine.set_state(teams_form, latest_ratings)
+           for league_id in league_ids:
+               engine.update(league_games[league_id], rounds_to_calibrate)
+           ratings_history, goals_given_points = engine.flush()
+    """
+    _HISTORY_COLUMNS = ['team_id', 'league_id', 'elo_rating', 'home_delta', 'away_delta', 'home_t', 'away_t', 'calibrating_game', 'date']
+    _GOALS_COLUMNS = ['ft_home', 'ft_away', 'ht_home', 'ht_away', 'points_diff', 'league_id', 'season', 'date']
+
+    def __init__(self, leagues_margins, margin_exp_value_given_sign, form_lr, k=20):
+        self.form_lr = form_lr
+        self.k = k
+
+        n_leagues = int(max(leagues_margins.league_id.max(), margin_exp_value_given_sign.league_id.max())) + 1
+        self.__league_margins = np.full((n_leagues, 3), np.nan)
+        self.__league_margins[leagues_margins.league_id.values] = leagues_margins[['expected_advantage', 'intercept', 'coef']].values
+        self.__league_exp_margins = np.full((n_leagues, 2), np.nan)
+        self.__league_exp_margins[margin_exp_value_given_sign.league_id.values] = margin_exp_value_given_sign[['1', '2']].values
+
+        self.team_ids = np.array([], dtype='int64')
+        self.__team_index = {}
+        self.__reset_rows()
+
+    @property
+    def ratings(self):
+        return pd.Series(self.__ratings, index=self.team_ids)
+
+    @property
+    def teams_form(self):
+        return pd.DataFrame({'team_id': self.team_ids,
+                             'home_delta': self.__home_delta,
+                             'away_delta': self.__away_delta,
+                             'home_t': self.__home_t,
+                             'away_t': self.__away_t})
+
+    def set_state(self, teams_form, ratings):
+        """ Loads the current form of the teams and their latest ratings ('ratings' is a Series indexed by team id).
+        """
+        self.team_ids = teams_form.team_id.values.astype('int64')
+        self.__team_index = {team_id: idx for idx, team_id in enumerate(self.team_ids.tolist())}
+
+        team_ratings = ratings.reindex(self.team_ids)
+        if team_ratings.isna().any():
+            raise ValueError(f'No elo ratings found for teams {self.team_ids[team_ratings.isna().values].tolist()}.')
+
+        self.__ratings = team_ratings.values.astype('float64')
+        # ratings read straight from the csv are float16 until a team's first update
+        self.__half_precision = np.full(len(self.team_ids), ratings.dtype == np.float16)
+        self.__home_delta = teams_form.home_delta.values.astype('float64')
+        self.__away_delta = teams_form.away_delta.values.astype('float64')
+        self.__home_t = teams_form.home_t.values.astype('int64')
+        self.__away_t = teams_form.away_t.values.astype('int64')
+
+    def update(self, games, rounds_to_calibrate):
+        """ Updates the ratings and form of the teams with 'games', which must be sorted by date.
+        """
+        try:
+            home_idxs = [self.__team_index[tid] for tid in games.home_team_id.tolist()]
+            away_idxs = [self.__team_index[tid] for tid in games.away_team_id.tolist()]
+        except KeyError as exc:
+            raise ValueError(f'Team with id {exc.args[0]} has no form entry for the current season.')
+
+        ratings = self.__ratings.tolist()
+        half_precision = self.__half_precision.tolist()
+        home_delta, away_delta = self.__home_delta.tolist(), self.__away_delta.tolist()
+        home_t, away_t = self.__home_t.tolist(), self.__away_t.tolist()
+
+        team_ids = self.team_ids.tolist()
+        form_lr, k = self.form_lr, self.k
+        league_ids = games.league_id.tolist()
+        league_margins = self.__league_margins[league_ids].tolist()
+        league_exp_margins = self.__league_exp_margins[league_ids].tolist()
+        ft_home, ft_away = games.ft_home.tolist(), games.ft_away.tolist()
+        dates, seasons = games.date.tolist(), games.season.tolist()
+        ht_home, ht_away = games.ht_home.tolist(), games.ht_away.tolist()
+
+        rows, goals = self.__history_rows, self.__goals_rows
+        for i, (h, a) in enumerate(zip(home_idxs, away_idxs)):
+            expected_advantage, intercept, coef = league_margins[i]
+            home_team_elo, away_team_elo = ratings[h], ratings[a]
+
+            if half_precision[h] and half_precision[a]:
+                ratings_diff = float(np.float16(home_team_elo) - np.float16(away_team_elo))
+            else:
+                ratings_diff = home_team_elo - away_team_elo
+            points_diff = ratings_diff + expected_advantage
+
+            goals_home, goals_away = ft_home[i], ft_away[i]
+            R_h = int(goals_home > goals_away) if goals_home != goals_away else 0.5
+            R_a = 1 - R_h
+
+            elo_delta_h = (R_h - self.__W_e(points_diff)) * k
+            elo_delta_a = (R_a - self.__W_e(-points_diff)) * k
+
+            margin = goals_home - goals_away
+            if abs(margin) >= 5:
+                margin = 5 if margin > 0 else -5
+            if margin != 0:
+                exp_margin = league_exp_margins[i][0 if margin > 0 else 1]
+                margin_given_exp = np.sqrt(abs(margin) / exp_margin)
+            else:
+                margin_given_exp = 1.
+
+            ratings[h] = home_team_elo + elo_delta_h * margin_given_exp
+            ratings[a] = away_team_elo + elo_delta_a * margin_given_exp
+            half_precision[h] = half_precision[a] = False
+
+            # update home/away form
+            expected_points_diff = (margin - intercept) / coef
+            # difference between true and expected points is halved
+            # the assumption is that both teams share the 'fault' for the difference equally
+            delta_points_diff = (points_diff - expected_points_diff) / 2
+
+            home_home_new = (1 - form_lr)*home_delta[h] - form_lr*delta_points_diff
+            away_away_new = (1 - form_lr)*away_delta[a] + form_lr*delta_points_diff
+            home_delta[h], away_delta[a] = home_home_new, away_away_new
+            home_t[h] += 1
+            away_t[a] += 1
+
+            calibrating_game = (home_t[h] + away_t[h] <= rounds_to_calibrate) or (home_t[a] + away_t[a] <= rounds_to_calibrate)
+            if not calibrating_game:
+                goals.append((goals_home, goals_away, ht_home[i], ht_away[i],
+                              (home_team_elo + home_home_new) - (away_team_elo + away_away_new),
+                              league_ids[i], seasons[i], dates[i]))
+
+            rows.append((team_ids[h], league_ids[i], ratings[h], home_home_new, away_delta[h], home_t[h], away_t[h], calibrating_game, dates[i]))
+            rows.append((team_ids[a], league_ids[i], ratings[a], home_delta[a], away_away_new, home_t[a], away_t[a], calibrating_game, dates[i]))
+
+        self.__ratings = np.array(ratings, dtype='float64')
+        self.__half_precision = np.array(half_precision, dtype='bool')
+        self.__home_delta, self.__away_delta = np.array(home_delta, dtype='float64'), np.array(away_delta, dtype='float64')
+        self.__home_t, self.__away_t = np.array(home_t, dtype='int64'), np.array(away_t, dtype='int64')
+
+    def update_in_parallel(self, leagues_games, executor):
+        """ Updates the ratings with the games of several leagues at once, each league in a separate worker of 'executor'.
+            'leagues_games' is a list of (games, rounds_to_calibrate) pairs. Leagues of a season have no teams in common,
+            so they can be updated independently - the results are merged in the order of 'leagues_games', exactly as if
+            the leagues were updated one after the other. If a team plays in several of the leagues, they are updated serially.
+        """
+        leagues_team_ids = [np.unique(games[['home_team_id', 'away_team_id']].values) for games, _ in leagues_games]
+        all_team_ids = np.concatenate(leagues_team_ids) if len(leagues_team_ids) > 0 else np.array([])
+        if len(np.unique(all_team_ids)) < len(all_team_ids):
+            for games, rounds_to_calibrate in leagues_games:
+                self.update(games, rounds_to_calibrate)
+            return
+
+        futures = [executor.submit(_update_engine, self.__subset(team_ids), games, rounds_to_calibrate)\
+                        for team_ids, (games, rounds_to_calibrate) in zip(leagues_team_ids, leagues_games)]
+        for future in futures:
+            self.__merge(future.result())
+
+    def flush(self):
+        """ Returns the ratings history and goals given points rows of all games updated since the last flush.
+        """
+        history = pd.DataFrame.from_records(self.__history_rows, columns=self._HISTORY_COLUMNS)
+        goals_given_points = pd.DataFrame.from_records(self.__goals_rows, columns=self._GOALS_COLUMNS)
+        self.__reset_rows()
+
+        return history, goals_given_points
+
+    def __subset(self, team_ids):
+        """ Returns a copy of the engine holding only the state of 'team_ids' and none of the collected rows.
+        """
+        try:
+            positions = np.array([self.__team_index[tid] for tid in team_ids.tolist()], dtype='int64')
+        except KeyError as exc:
+            raise ValueError(f'Team with id {exc.args[0]} has no form entry for the current season.')
+
+        engine = EloUpdateEngine.__new__(EloUpdateEngine)
+        engine.form_lr, engine.k = self.form_lr, self.k
+        engine.__league_margins, engine.__league_exp_margins = self.__league_margins, self.__league_exp_margins
+        engine.team_ids = self.team_ids[positions]
+        engine.__team_index = {team_id: idx for idx, team_id in enumerate(engine.team_ids.tolist())}
+        engine.__ratings, engine.__half_precision = self.__ratings[positions], self.__half_precision[positions]
+        engine.__home_delta, engine.__away_delta = self.__home_delta[positions], self.__away_delta[positions]
+        engine.__home_t, engine.__away_t = self.__home_t[positions], self.__away_t[positions]
+        engine.__reset_rows()
+        return engine
+
+    def __merge(self, engine):
+        """ Takes over the state and the collected rows of an engine returned by __subset.
+        """
+        positions = np.array([self.__team_index[tid] for tid in engine.team_ids.tolist()], dtype='int64')
+        self.__ratings[positions], self.__half_precision[positions] = engine.__ratings, engine.__half_precision
+        self.__home_delta[positions], self.__away_delta[positions] = engine.__home_delta, engine.__away_delta
+        self.__home_t[positions], self.__away_t[positions] = engine.__home_t, engine.__away_t
+
+        self.__history_rows.extend(engine.__history_rows)
+        self.__goals_rows.extend(engine.__goals_rows)
+
+    def __reset_rows(self):
+        self.__history_rows = []
+        self.__goals_rows = []
+
+    @staticmethod
+    def __W_e(dr, q=400):
+        return 1 / (10**(-dr/q) + 1)
@@ -1,10 +1,17 @@
+import os
 import numpy as np
 import pandas as pd
 from datetime import datetime
-import warnings
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 
-from data_services import SoccerwayFootballDataService
-from constants import ACCEPTED_GOALS, DB_PATH
+from constants import DB_PATH
+from utils import PartitionedTableStore
+from .elo_engine import EloUpdateEngine, season_start_date, season_starting_ratings
+from .rating_index import RatingHistoryIndex
+from .similar_games import SimilarGamesIndex
+from .elo_checkpoint import EloCheckpoint
+from .poisson_goals import PoissonGoalsModel
 
 class EloRatingsProbabilityEstimator:
     """Elo ratings-based model for estimating probabilities in games. Uses a standard elo ratings system adapted
@@ -32,6 +39,15 @@ class EloRatingsProbabilityEstimator:
                                  difference is too specific and would often lead to either very little or no games that fit the
                                  criterion, the model uses games that had points_difference +/- delta_points_diff as their points
                                  difference
+           'n_jobs'            - Number of worker processes updating the ratings of a season's leagues in parallel. With the
+                                 default of 1 the leagues are updated serially; None uses all processors.
+           'ephemeral'         - If True, update_data keeps all changes in memory and nothing is written under DB_PATH until
+                                 commit() is called. Ephemeral estimators can run side by side (e.g. what-if replays) without
+                                 touching the stored state.
+           'pricing'           - How probabilities are derived from the points difference of a game. 'window' uses the frequency
+                                 of events in similar past games (see delta_points_diff); 'poisson' evaluates per league Poisson
+                                 goal models fitted on the points difference (see PoissonGoalsModel), which takes constant time
+                                 per game.
     """
     _LEAGUE_INIT_POINTS_CSV_PATH = DB_PATH + 'leagues_init_points.csv' 
     _LEAGUE_MARGINS_CSV_PATH = DB_PATH + 'league_margins.csv' 
@@ -39,14 +55,53 @@ class EloRatingsProbabilityEstimator:
     _GOALS_GIVEN_POINTS_CSV_PATH = DB_PATH + 'goals_given_points.csv'
     _MARGIN_GIVEN_POINTS_CSV_PATH = DB_PATH + 'margin_given_points.csv'
     _MARGINS_EXP_GIVEN_SIGN_PATH = DB_PATH + 'league_exp_margin_given_sign.csv' 
+    _MARGIN_COUNTS_CSV_PATH = DB_PATH + 'league_margin_counts.csv'
     _TEAMS_FORM_CSV_PATH = DB_PATH + 'teams_form.csv'
+    _DATA_VERSION_CSV_PATH = DB_PATH + 'elo_data_version.csv'
+    _CHECKPOINT_PATH = DB_PATH + 'elo_checkpoint.npz'
+    _HISTORY_STORE_PATH = DB_PATH + 'elo_history/'
+    _CURRENT_RATINGS_CSV_PATH = DB_PATH + 'teams_elo_current.csv'
+
+    _ELO_RATINGS_DTYPES = {'team_id': 'int32',
+                           'league_id': 'int8',
+                           'elo_rating': 'float16',
+                           'date': 'datetime64[ns]',
+                           'home_delta': 'float16',
+                           'away_delta': 'float16',
+                           'home_t': 'int8',
+                           'away_t': 'int8',
+                           'calibrating_game': 'bool'}
+    _GOALS_GIVEN_POINTS_DTYPES = {'date': 'datetime64[ns]',
+                                  'season': 'object',
+                                  'league_id': 'int8',
+                                  'ft_home': 'int8',
+                                  'ft_away': 'int8',
+                                  'ht_home': 'int8',
+                                  'ht_away': 'int8',
+                                  'points_diff': 'float16'}
+    _MARGIN_GIVEN_POINTS_DTYPES = {'ft_home': 'int8',
+                                   'ft_away': 'int8',
+                                   'ht_home': 'int8',
+                                   'ht_away': 'int8',
+                                   'points_diff': 'float16',
+                                   'league_id': 'int8',
+                                   'season': 'object',
+                                   'date': 'datetime64[ns]'}
+    _HISTORY_TABLES = {'teams_elo': (_ELO_RATINGS_CSV_PATH, _ELO_RATINGS_DTYPES),
+                       'goals_given_points': (_GOALS_GIVEN_POINTS_CSV_PATH, _GOALS_GIVEN_POINTS_DTYPES),
+                       'margin_given_points': (_MARGIN_GIVEN_POINTS_CSV_PATH, _MARGIN_GIVEN_POINTS_DTYPES)}
+
+    _PRICING_METHODS = ['window', 'poisson']
 
     _INIT_CALIBRATION_ROUNDS = 20
     
     def __init__(self,
                  football_database,
                  form_lr = 0.2,
-                 delta_points_diff = 30):
+                 delta_points_diff = 30,
+                 n_jobs = 1,
+                 ephemeral = False,
+                 pricing = 'window'):
         self.db = football_database
 
         if form_lr < 0. or form_lr > 1.:
@@ -56,37 +111,81 @@ class EloRatingsProbabilityEstimator:
         if delta_points_diff <= 0:
             raise ValueError('Parameter delta_points_diff must be a positive number.')
         self.delta_points_diff = delta_points_diff
+        self.n_jobs = n_jobs
+        self.ephemeral = ephemeral
+
+        if pricing not in self._PRICING_METHODS:
+            raise ValueError(f'Unknown pricing method {pricing}. Valid methods are {self._PRICING_METHODS}.')
+        self.pricing = pricing
 
         self.__teams_elo_score = None
+        self.__current_ratings = None
+        self.__rating_index = None
         self.__goals_given_points = None
+        self.__similar_games_index = None
+        self.__poisson_goals_model = None
         self.__margin_given_points = None
         self.__leagues_init_points = None
         self.__leagues_margins = None
         self.__teams_form = None
         self.__mevgs = None
+        self.__margin_counts = None
+        self.__data_version = None
+        self.__current_games = None
+        self.__current_state_date = None
 
-
-        self.__update_list = []
         self.__margin_given_points_new = []
-        self.__goals_given_points_new = []
+
+        # history tables are stored append-only, partitioned by season
+        self.__history_stores = {table: PartitionedTableStore(self._HISTORY_STORE_PATH + table + '/', list(dtypes))\
+                                    for table, (_, dtypes) in self._HISTORY_TABLES.items()}
+        # rows not yet written to the history stores - (table, rows, season), kept until commit() in ephemeral mode
+        self.__pending_appends = []
+        # ratings rows written while the ratings history was not in memory, at the precision they were computed at - they
+        # replace their stored copies when the history is loaded, and are dropped once it is loaded or compacted
+        self.__computed_ratings_rows = []
 
     @property
     def teams_elo_score(self):
         if self.__teams_elo_score is None:
-            self.__teams_elo_score = pd.read_csv(self._ELO_RATINGS_CSV_PATH)\
-                                            .astype(dtype={'team_id': 'int32',
-                                                           'league_id': 'int8',
-                                                           'elo_rating': 'float16',
-                                                           'date': 'datetime64[ns]',
-                                                           'home_delta': 'float16',
-                                                           'away_delta': 'float16',
-                                                           'home_t': 'int8',
-                                                           'away_t': 'int8',
-                                                           'calibrating_game': 'bool'})
+            self.__teams_elo_score = self.__load_history_table('teams_elo')
         return self.__teams_elo_score
 
     @teams_elo_score.setter
-    def teams_elo_score(self, value): self.__teams_elo_score = value
+    def teams_elo_score(self, value):
+        self.__teams_elo_score = value
+        self.__rating_index = None
+        self.__current_state_date = None
+
+    @property
+    def current_ratings(self):
+        """ Latest entry of the ratings history of every team - all that predicting upcoming games needs.
+        """
+        if self.__current_ratings is None:
+            if os.path.isfile(self._CURRENT_RATINGS_CSV_PATH):
+                self.__current_ratings = pd.read_csv(self._CURRENT_RATINGS_CSV_PATH).astype(dtype=self._ELO_RATINGS_DTYPES)
+            else:
+                self.__current_ratings = self.__latest_entries(self.teams_elo_score)
+        return self.__current_ratings
+
+    @property
+    def rating_index(self):
+        if self.__rating_index is None:
+            if self.__teams_elo_score is not None:
+                self.__rating_index = RatingHistoryIndex(self.__teams_elo_score)
+            else:
+                # the ratings history stays archived until a historical query needs it
+                self.__rating_index = RatingHistoryIndex(self.current_ratings)
+                self.__current_state_date = self.current_ratings.date.max() if len(self.current_ratings) > 0 else None
+        return self.__rating_index
+
+    @property
+    def data_version(self):
+        """ Number of games and date of the last game per league that the stored ratings were built on.
+        """
+        if self.__data_version is None and os.path.isfile(self._DATA_VERSION_CSV_PATH):
+            self.__data_version = pd.read_csv(self._DATA_VERSION_CSV_PATH, parse_dates=['last_date'])
+        return self.__data_version
 
     @property
     def margin_exp_value_given_sign(self):
@@ -94,6 +193,18 @@ class EloRatingsProbabilityEstimator:
             self.__mevgs = pd.read_csv(self._MARGINS_EXP_GIVEN_SIGN_PATH)
         return self.__mevgs
 
+    @property
+    def margin_counts(self):
+        """ Number of home wins, away wins and draws by goal margin, per league and season.
+        """
+        if self.__margin_counts is None:
+            if os.path.isfile(self._MARGIN_COUNTS_CSV_PATH):
+                self.__margin_counts = pd.read_csv(self._MARGIN_COUNTS_CSV_PATH, dtype={'sign': str})
+            else:
+                self.__margin_counts = pd.DataFrame([], columns=['league_id', 'season', 'sign', 'margin', 'games', 'season_games'])\
+                                         .astype({'margin': 'int64', 'games': 'int64', 'season_games': 'int64'})
+        return self.__margin_counts
+
     @property
     def leagues_margins(self):
         if self.__leagues_margins is None:
@@ -118,417 +229,413 @@ class EloRatingsProbabilityEstimator:
     @property
     def goals_given_points(self):
         if self.__goals_given_points is None:
-            self.__goals_given_points = pd.read_csv(self._GOALS_GIVEN_POINTS_CSV_PATH)\
-                                            .astype(dtype={'date': 'datetime64[ns]',
-                                                           'season': 'object',
-                                                           'league_id': 'int8',
-                                                           'ft_home': 'int8',
-                                                           'ft_away': 'int8',
-                                                           'ht_home': 'int8',
-                                                           'ht_away': 'int8',
-                                                           'points_diff': 'float16'})
+            self.__goals_given_points = self.__load_history_table('goals_given_points')
         return self.__goals_given_points
 
     @goals_given_points.setter
-    def goals_given_points(self, value): self.__goals_given_points = value
+    def goals_given_points(self, value):
+        self.__goals_given_points = value
+        self.__similar_games_index = None
+        self.__poisson_goals_model = None
+
+    @property
+    def similar_games_index(self):
+        if self.__similar_games_index is None:
+            self.__similar_games_index = SimilarGamesIndex(self.goals_given_points)
+        return self.__similar_games_index
+
+    @property
+    def poisson_goals_model(self):
+        if self.__poisson_goals_model is None:
+            self.__poisson_goals_model = PoissonGoalsModel(self.goals_given_points)
+        return self.__poisson_goals_model
 
     @property
     def margin_given_points(self):
         if self.__margin_given_points is None:
-            self.__margin_given_points = pd.read_csv(self._MARGIN_GIVEN_POINTS_CSV_PATH)\
-                                            .astype(dtype={'ft_home': 'int8',
-                                                           'ft_away': 'int8',
-                                                           'ht_home': 'int8',
-                                                           'ht_away': 'int8',
-                                                           'points_diff': 'float16',
-                                                           'league_id': 'int8',
-                                                           'season': 'object',
-                                                           'date': 'datetime64[ns]'})
+            self.__margin_given_points = self.__load_history_table('margin_given_points')
         return self.__margin_given_points
 
     @margin_given_points.setter
     def margin_given_points(self, value): self.__margin_given_points = value
 
     def get_rating_at_date(self, team_id, date):
-        return self.teams_elo_score[(self.teams_elo_score.team_id == team_id)&(self.teams_elo_score.date <= date)]\
-                        .sort_values('date', ascending = False)['elo_rating'].values[0]
+        return self.__history_index(date).rating_at(team_id, date)
+
+    def ratings_at(self, date, strict=False):
+        """ Returns the elo rating and form of every team as they stood on 'date' (before it, if 'strict'), as a DataFrame
+            indexed by team id. Teams with no rating by then are left out.
+        """
+        return next(self.iter_ratings([date], strict))[1]
+
+    def iter_ratings(self, dates, strict=False):
+        """ Yields (date, ratings) for each of the sorted 'dates', where ratings is the DataFrame ratings_at would return.
+            Snapshots are read from the stored ratings history in a single pass - nothing is recomputed.
+        """
+        dates = [pd.Timestamp(date) for date in dates]
+        index = self.__history_index(dates[0] if len(dates) > 0 else None)
+
+        for date, positions in zip(dates, index.iter_snapshots([np.datetime64(date, 'ns') for date in dates], strict)):
+            rated = positions >= 0
+            positions = positions[rated]
+            yield date, pd.DataFrame({'elo_rating': index.ratings[positions],
+                                      'home_delta': index.home_delta[positions],
+                                      'away_delta': index.away_delta[positions],
+                                      'date': index.dates[positions]},
+                                     index=pd.Index(index.team_ids[rated], name='team_id'))
         
     def estimate_odds(self, league_ids, start_date, end_date, use_form=True):
+        if self.__teams_elo_score is None and self.__rating_index is None:
+            self.load_checkpoint()
         self.update_data(calibration_rounds=8)
 
         games = self.db.provide_games(league_ids, start_date, end_date)
+        if len(games) > 0:
+            self.__history_index(games.date.min())
+        points_diffs = self.__games_points_diffs(games, use_form)
+        odds = games[['date', 'home_team_id', 'away_team_id', 'league_id']].reset_index(drop=True)
 
-        odds = [self.__estimate_game_odds(games.loc[idx], use_form) for idx in games.index]
-        return pd.DataFrame.from_dict(odds)
+        if self.pricing == 'poisson':
+            probabilities = pd.DataFrame(self.poisson_goals_model.probabilities(games.league_id.values, points_diffs))
+            return pd.concat([odds, probabilities], axis=1)
+
+        delta = self.delta_points_diff
+        # reduce delta if teams are too closely matched
+        #if 2*delta >= abs(points_diff):
+        #    delta = delta/2
+        #    #delta = points_diff/2
+        starts, ends = self.similar_games_index.windows(points_diffs, delta)
+        probabilities = pd.DataFrame(self.similar_games_index.probabilities(starts, ends))
+        return pd.concat([odds, probabilities], axis=1)
+
+    def is_up_to_date(self):
+        """ Checks whether the ratings are built on all games in the database. Repeated checks against the same games
+            table are free.
+        """
+        if self.__current_games is not None and self.__current_games is self.db.games:
+            return True
+
+        stored_version = self.data_version
+        if stored_version is None or not self.__games_version().equals(self.__normalize_version(stored_version)):
+            return False
+
+        self.__current_games = self.db.games
+        return True
+
+    def load_checkpoint(self):
+        """ Starts the estimator from the checkpoint saved by the last update, instead of the full ratings and goals
+            history. Returns False (and loads nothing) if there is no checkpoint built on the current games data.
+        """
+        if not os.path.isfile(self._CHECKPOINT_PATH):
+            return False
+
+        checkpoint = EloCheckpoint.load(self._CHECKPOINT_PATH)
+        self.__data_version = checkpoint.data_version
+        if not self.is_up_to_date():
+            self.__data_version = None
+            return False
+
+        self.__rating_index = checkpoint.rating_index
+        self.__current_state_date = checkpoint.last_rating_date
+        self.__similar_games_index = checkpoint.similar_games_index
+        self.__poisson_goals_model = checkpoint.poisson_goals_model
+        self.__teams_form = checkpoint.teams_form
+        return True
+
+    def save_checkpoint(self):
+        # the checkpoint stands in for the stored tables, so it is built at the precision a fresh process loads them at -
+        # both ways of starting the estimator then price games identically
+        rating_index = RatingHistoryIndex(self.current_ratings.astype(dtype=self._ELO_RATINGS_DTYPES))
+        if self.__goals_given_points is None or self.__goals_given_points.points_diff.dtype == np.float16:
+            similar_games_index = self.similar_games_index
+            poisson_goals_model = self.poisson_goals_model if self.pricing == 'poisson' else None
+        else:
+            stored_goals_given_points = self.__goals_given_points.astype(dtype=self._GOALS_GIVEN_POINTS_DTYPES)
+            similar_games_index = SimilarGamesIndex(stored_goals_given_points)
+            poisson_goals_model = PoissonGoalsModel(stored_goals_given_points) if self.pricing == 'poisson' else None
+
+        EloCheckpoint(rating_index, self.teams_form, similar_games_index, self.data_version,
+                      poisson_goals_model).save(self._CHECKPOINT_PATH)
+
+    def compact(self):
+        """ Merges the chunks of every season of the stored history tables and releases the in-memory ratings history.
+            Predictions only use the current ratings table, so memory use stays flat across seasons; the history is read
+            back from its store at the stored precision when a historical query (e.g. ratings_at) needs it. In ephemeral
+            mode nothing is written, only the in-memory history is released.
+        """
+        if not self.ephemeral:
+            self.current_ratings.to_csv(self._CURRENT_RATINGS_CSV_PATH, index_label=False)
+            for store in self.__history_stores.values():
+                store.compact()
+
+        self.__computed_ratings_rows = []
+        if self.__teams_elo_score is not None:
+            self.__teams_elo_score = None
+            self.__rating_index = None
+            self.__current_state_date = None
+
+    def commit(self):
+        """ Writes the state updated in memory to DB_PATH - the history rows added since the last commit, the current
+            ratings and form, the data version and the checkpoint. Only needed in ephemeral mode, where update_data
+            writes nothing.
+        """
+        for table in self._HISTORY_TABLES:
+            if not self.__history_stores[table].exists():
+                self.__migrate_history_table(table)
+        for table, new_rows, season in self.__pending_appends:
+            self.__write_history_rows(table, new_rows, season)
+        self.__pending_appends = []
+
+        self.__save_stats()
+        if self.__margin_counts is not None:
+            self.__save_margin_expectations()
+        if self.data_version is not None:
+            self.__save_data_version()
 
     def update_data(self, calibration_rounds=8):
+        if self.is_up_to_date():
+            return
+
         current_season = int(self.db.date_to_season(datetime.now()))
 
-        if len(self.teams_elo_score) == 0:
+        if len(self.current_ratings) == 0:
             last_update_season = None
             update_seasons = sorted(list(self.db.games.season.unique()))
         else:
-            last_update_season = int(self.db.date_to_season(self.teams_elo_score.date.max()))
+            last_update_season = int(self.db.date_to_season(self.current_ratings.date.max()))
             update_seasons = sorted([s for s in self.db.games.season.unique() if s > last_update_season]) if current_season != last_update_season\
                                                                                                           else [current_season]
 
-        # prepare margin_exp_value_given_sign for easy lookup depending on league
-        league_ids = self.margin_exp_value_given_sign['league_id'].values
-        league_mevgs = {lid: mevgs for lid, mevgs in zip(league_ids, self.margin_exp_value_given_sign.drop('league_id', axis=1).to_dict(orient='records'))}
+        # refreshed once per update - only seasons with new games are counted again
+        self.__update_margin_exp_value_given_sign()
+
+        # league parameters are preloaded into the update engine's arrays
+        engine = EloUpdateEngine(self.leagues_margins, self.margin_exp_value_given_sign, self.form_lr)
 
-        league_start_season = {lid: self.db.games[self.db.games.league_id == lid].season.min() for lid in league_ids}
+        league_start_season = self.db.games.groupby('league_id')['season'].min()
         
-        for update_season in update_seasons:
-            team_ids_this_season = np.unique(self.db.games[self.db.games.season == update_season][['home_team_id', 'away_team_id']].values)
-
-            if last_update_season is None or last_update_season < current_season:
-                self.__initialize_elo_ratings(team_ids_this_season, update_season)
-                #self.__update_margin_exp_value_given_sign()
-
-                # start team form afresh in new season
-                self.teams_form = pd.DataFrame.from_dict([{'team_id': tid,
-                                                           'home_delta': 0.,
-                                                           'away_delta': 0.,
-                                                           'home_t': 0,
-                                                           'away_t': 0}\
-                                                             for tid in team_ids_this_season])
-                self.teams_form.to_csv(self._TEAMS_FORM_CSV_PATH, index_label=False)
-
-                games_to_update = self.db.games[self.db.games.season == update_season].sort_values('date', ascending=True)
-            else:
-                games_to_update = self.db.games[(self.db.games.season == update_season)&\
-                                                (self.db.games.date > self.teams_elo_score.date.max())]\
-                                                .sort_values('date', ascending=True)
-            if len(games_to_update) > 0:
-                games_to_update = games_to_update[['ft_home', 'ft_away', 'date', 'league_id', 'ht_home', 'ht_away', 'season', 'home_team_id', 'away_team_id']].copy()
-                games_to_update['margin'] = (games_to_update.ft_home - games_to_update.ft_away)
-                games_to_update['sign'] = games_to_update.apply(lambda x: 'X' if x.ft_home == x.ft_away else str(int(x.ft_home < x.ft_away) + 1),
-                                                                  axis = 1)
-
-                # get last team ratings in a quick table
-                self.__teams_ratings = {team_id: self.teams_elo_score[(self.teams_elo_score.team_id == team_id)]\
-                                                    .sort_values('date', ascending = False)\
-                                                        ['elo_rating'].values[0]\
-                                                            for team_id in team_ids_this_season}
-
-                for league_id in games_to_update['league_id'].unique():
-                    rounds_to_calibrate = calibration_rounds if update_season > league_start_season[league_id] else self._INIT_CALIBRATION_ROUNDS
-
-                    games_to_update_league = games_to_update[games_to_update.league_id == league_id]
-                    games_to_update_league.apply(lambda game: self.__update_elo(game, league_mevgs[game.league_id], rounds_to_calibrate), axis = 1)
-
-                self.__update_stats()
-                self.__save_stats()
-
-                last_update_season  = update_season
+        executor = ProcessPoolExecutor(max_workers=self.n_jobs) if self.n_jobs != 1 else nullcontext()
+        with executor:
+            for update_season in update_seasons:
+                team_ids_this_season = np.unique(self.db.games[self.db.games.season == update_season][['home_team_id', 'away_team_id']].values)
+
+                if last_update_season is None or last_update_season < current_season:
+                    self.__initialize_elo_ratings(update_season)
+
+                    # start team form afresh in new season
+                    self.teams_form = pd.DataFrame.from_dict([{'team_id': tid,
+                                                               'home_delta': 0.,
+                                                               'away_delta': 0.,
+                                                               'home_t': 0,
+                                                               'away_t': 0}\
+                                                                 for tid in team_ids_this_season])
+                    if not self.ephemeral:
+                        self.teams_form.to_csv(self._TEAMS_FORM_CSV_PATH, index_label=False)
+
+                    games_to_update = self.db.games[self.db.games.season == update_season].sort_values('date', ascending=True)
+                else:
+                    games_to_update = self.db.games[(self.db.games.season == update_season)&\
+                                                    (self.db.games.date > self.current_ratings.date.max())]\
+                                                    .sort_values('date', ascending=True)
+                if len(games_to_update) > 0:
+                    games_to_update = games_to_update[['ft_home', 'ft_away', 'date', 'league_id', 'ht_home', 'ht_away', 'season', 'home_team_id', 'away_team_id']]
+
+                    engine.set_state(self.teams_form, self.rating_index.latest())
+
+                    leagues_games = [(games_to_update[games_to_update.league_id == league_id],
+                                      calibration_rounds if update_season > league_start_season[league_id] else self._INIT_CALIBRATION_ROUNDS)\
+                                        for league_id in games_to_update['league_id'].unique()]
+                    if self.n_jobs != 1:
+                        engine.update_in_parallel(leagues_games, executor)
+                    else:
+                        for league_games, rounds_to_calibrate in leagues_games:
+                            engine.update(league_games, rounds_to_calibrate)
+
+                    self.teams_form = engine.teams_form
+                    self.__update_stats(update_season, *engine.flush())
+                    if not self.ephemeral:
+                        self.__save_stats()
+
+                    last_update_season  = update_season
+
+        self.__data_version = self.__games_version()
+        self.__current_games = self.db.games
+        if not self.ephemeral:
+            self.__save_data_version()
+
+    def __save_data_version(self):
+        self.data_version.to_csv(self._DATA_VERSION_CSV_PATH, index=False)
+        self.save_checkpoint()
     
-    def __estimate_game_odds(self, game, use_form=True):
-        home_team_stats = self.teams_elo_score[(self.teams_elo_score.team_id == game.home_team_id)&\
-                                             (self.teams_elo_score.date < game.date)]\
-                                    .sort_values('date', ascending=False)
-        away_team_stats = self.teams_elo_score[(self.teams_elo_score.team_id == game.away_team_id)&\
-                                             (self.teams_elo_score.date < game.date)]\
-                                    .sort_values('date', ascending=False)
-
-        home_team_rating = home_team_stats['elo_rating'].values[0]
-        away_team_rating = away_team_stats['elo_rating'].values[0]
+    def __history_index(self, since=None):
+        """ Returns a rating index that can answer queries on dates from 'since' on. An index over the current state only
+            holds the latest rating of every team, so earlier dates need the archived ratings history.
+        """
+        index = self.rating_index
+        if self.__current_state_date is not None and (since is None or pd.Timestamp(since) <= self.__current_state_date):
+            index = self.__rating_index = RatingHistoryIndex(self.teams_elo_score)
+            self.__current_state_date = None
+        return index
+
+    def __games_points_diffs(self, games, use_form=True):
+        """ Returns the points differences of 'games' based on the teams' last ratings (and form) before each game.
+        """
+        index = self.rating_index
+        home_positions = index.lookup(games.home_team_id.values, games.date.values, strict=True)
+        away_positions = index.lookup(games.away_team_id.values, games.date.values, strict=True)
+        if (home_positions < 0).any() or (away_positions < 0).any():
+            missing = games[(home_positions < 0)|(away_positions < 0)]
+            raise ValueError(f'No elo ratings recorded before games {missing[["home_team_id", "away_team_id", "date"]].values.tolist()}.')
+
+        home_team_ratings = index.ratings[home_positions]
+        away_team_ratings = index.ratings[away_positions]
         if use_form:
-            home_team_rating += home_team_stats['home_delta'].values[0]
-            away_team_rating += away_team_stats['away_delta'].values[0]
+            home_team_ratings = home_team_ratings + index.home_delta[home_positions]
+            away_team_ratings = away_team_ratings + index.away_delta[away_positions]
 
-        points_diff = home_team_rating - away_team_rating
-            
-        delta = self.delta_points_diff
-        # reduce delta if teams are too closely matched
-        #if 2*delta >= abs(points_diff):
-        #    delta = delta/2
-        #    #delta = points_diff/2
-        sim_games = self.goals_given_points[(self.goals_given_points.points_diff >= (points_diff - delta))&\
-                                            (self.goals_given_points.points_diff <= (points_diff + delta))]
-        ngames = len(sim_games)
-        if ngames < 20:
-            if points_diff - delta > self.goals_given_points.points_diff.max():
-                sim_games = self.goals_given_points.nlargest(20, 'points_diff')
-                ngames = len(sim_games)
-            elif ngames > 0:
-                warnings.warn(f'Less than twenty games with points difference between {points_diff - delta} and ' +\
-                                 f'{points_diff + delta} recorded. Perhaps you should increase delta_points_diff?')
-            else:
-                raise ValueError(f'No games with points difference between {points_diff - delta} and ' +\
-                                 f'{points_diff + delta} recorded. Perhaps you should increase delta_points_diff?')
-        
-        btts = (sim_games.ft_home > 0)&(sim_games.ft_away > 0)
-        ft_home = sim_games.ft_home > sim_games.ft_away
-        ft_draw = sim_games.ft_home == sim_games.ft_away
-        ft_away = sim_games.ft_home < sim_games.ft_away
-        ht_home = sim_games.ht_home > sim_games.ht_away
-        ht_draw = sim_games.ht_home == sim_games.ht_away
-        ht_away = sim_games.ht_home < sim_games.ht_away
-        first_half_btts = (sim_games.ht_home > 0)&(sim_games.ht_away > 0)
-        second_half_btts = ((sim_games.ft_home-sim_games.ht_home) > 0)&((sim_games.ft_away-sim_games.ht_away) > 0)
-        game_odds = {
-            # game info
-            'date': game.date,
-            'home_team_id': game.home_team_id,
-            'away_team_id': game.away_team_id,
-            'league_id': game.league_id,
-            # main
-            '1': len(sim_games[ft_home])/ngames,
-            'X': len(sim_games[ft_draw])/ngames,
-            '2': len(sim_games[ft_away])/ngames,
-            'btts_yes': len(sim_games[btts])/ngames,
-            'btts_no': len(sim_games[~btts])/ngames,
-            # half
-            'ht_1': len(sim_games[ht_home])/ngames,
-            'ht_X': len(sim_games[ht_draw])/ngames,
-            'ht_2': len(sim_games[ht_away])/ngames,
-            'first_half_btts_yes': len(sim_games[first_half_btts])/ngames,
-            'first_half_btts_no': len(sim_games[~first_half_btts])/ngames,
-            'second_half_btts_yes': len(sim_games[second_half_btts])/ngames,
-            'second_half_btts_no': len(sim_games[~second_half_btts])/ngames,
-            # double chance
-            '1/X': len(sim_games[ft_home|ft_draw])/ngames,
-            'X/2': len(sim_games[ft_draw|ft_away])/ngames,
-            '1/2': len(sim_games[ft_home|ft_away])/ngames,
-            # ht double chance
-            'ht_1/X': len(sim_games[ht_home|ht_draw])/ngames,
-            'ht_X/2': len(sim_games[ht_draw|ht_away])/ngames,
-            'ht_1/2': len(sim_games[ht_home|ht_away])/ngames,
-            # ht-ft
-            '1-1': len(sim_games[ht_home&ft_home])/ngames,
-            '1-X': len(sim_games[ht_home&ft_draw])/ngames,
-            '1-2': len(sim_games[ht_home&ft_away])/ngames,
-            'X-1': len(sim_games[ht_draw&ft_home])/ngames,
-            'X-X': len(sim_games[ht_draw&ft_draw])/ngames,
-            'X-2': len(sim_games[ht_draw&ft_away])/ngames,
-            '2-1': len(sim_games[ht_away&ft_home])/ngames,
-            '2-X': len(sim_games[ht_away&ft_draw])/ngames,
-            '2-2': len(sim_games[ht_away&ft_away])/ngames
-        }
-        
-        tot_goals = sim_games.ft_home + sim_games.ft_away
-        ft_over = {f'over_{ng}': len(tot_goals[tot_goals > ng])/ngames for ng in ACCEPTED_GOALS}
-        ft_under = {f'under_{k[-3:]}': 1-v for k,v in ft_over.items()}
-        result_tg = {f'home_&over_{ng}': len(sim_games[ft_home&(tot_goals > ng)])/ngames for ng in ACCEPTED_GOALS}
-        result_tg.update({f'home_&under_{ng}': len(sim_games[ft_home&(tot_goals < ng)])/ngames for ng in ACCEPTED_GOALS})
-        result_tg.update({f'away_&over_{ng}': len(sim_games[ft_away&(tot_goals > ng)])/ngames for ng in ACCEPTED_GOALS})
-        result_tg.update({f'away_&under_{ng}': len(sim_games[ft_away&(tot_goals < ng)])/ngames for ng in ACCEPTED_GOALS})
-
-        tg_btts = {f'over_{ng}_btts_yes': len(sim_games[(tot_goals > ng)&(btts)])/ngames for ng in ACCEPTED_GOALS if ng > 1.5}
-        tg_btts.update({f'over_{ng}_btts_no': len(sim_games[(tot_goals > ng)&(~btts)])/ngames for ng in ACCEPTED_GOALS if ng > 1.5})
-        tg_btts.update({f'under_{ng}_btts_yes': len(sim_games[(tot_goals < ng)&(btts)])/ngames for ng in ACCEPTED_GOALS if ng > 1.5})
-        tg_btts.update({f'under_{ng}_btts_no': len(sim_games[(tot_goals < ng)&(~btts)])/ngames for ng in ACCEPTED_GOALS if ng > 1.5})
-        game_odds.update(ft_over)
-        game_odds.update(ft_under)
-        game_odds.update(result_tg)
-        game_odds.update(tg_btts)
-        
-        return game_odds
-
-    def __update_elo(self,
-                   game,
-                   margin_exp_value_given_sign,
-                   rounds_to_calibrate,
-                   k = 20,
-                   update_list = []):
-
-        home_team_elo = self.__teams_ratings[game.home_team_id]
-        away_team_elo = self.__teams_ratings[game.away_team_id]
-
-#        # filling margin_given_points for future use in model
-#        # for predicting expected value of goals margin given points difference
-#        if not calibrating_game:
-##             is_home_better = home_team_elo > away_team_elo
-##             points_diff = abs(away_team_elo - home_team_elo)
-##             margin = game.ft_home - game.ft_away if is_home_better else game.ft_away - game.ft_home
-#            points_diff = home_team_elo - away_team_elo
-#            self.__margin_given_points_new.append({'ft_home': game.ft_home,
-#                                                   'ft_away': game.ft_away,
-#                                                   'ht_home': game.ht_home,
-#                                                   'ht_away': game.ht_away,
-#                                                   'points_diff': points_diff,
-#                                                   'league_id': game.league_id,
-#                                                   'season': game.season,
-#                                                   'date': game.date})
-
-        league_margins = self.leagues_margins[self.leagues_margins.league_id == game.league_id]
-        expected_advantage, intercept, coef = league_margins[['expected_advantage',
-                                                              'intercept',
-                                                              'coef']].values[0]        
-        
-        points_diff = home_team_elo - away_team_elo + expected_advantage        
-
-        R_h = int(game.ft_home > game.ft_away) if game.ft_home != game.ft_away else 0.5
-        R_a = 1 - R_h
+        return home_team_ratings - away_team_ratings
 
-        E_h = self.__W_e(points_diff)
-        E_a = self.__W_e(-points_diff)
+    def __games_version(self):
+        version = self.db.games.groupby('league_id')['date'].agg(['count', 'max']).reset_index()
+        return self.__normalize_version(version.rename(columns={'count': 'games', 'max': 'last_date'}))
 
-        elo_delta_h = (R_h - E_h) * k
-        elo_delta_a = (R_a - E_a) * k
+    @staticmethod
+    def __normalize_version(version):
+        return version[['league_id', 'games', 'last_date']].astype({'league_id': 'int64', 'games': 'int64', 'last_date': 'datetime64[ns]'})\
+                                                           .sort_values('league_id').reset_index(drop=True)
 
-        sign_func = lambda a: 1 if a>0 else -1 if a<0 else 0
-        margin = game.margin if abs(game.margin) < 5 else 5*sign_func(game.margin)
-        if abs(margin) > 0:
-            exp_margin = margin_exp_value_given_sign[game.sign]
-            margin_given_exp = np.sqrt(abs(margin) / exp_margin)
-        else:
-            margin_given_exp = 1.
-
-        elo_margin_h = elo_delta_h * margin_given_exp
-        elo_margin_a = elo_delta_a * margin_given_exp
-
-        self.__teams_ratings[game.home_team_id] = home_team_elo + elo_margin_h
-        self.__teams_ratings[game.away_team_id] = away_team_elo + elo_margin_a
-
-        # update home/away form
-        expected_points_diff = (margin - intercept) / coef
-        true_points_diff = home_team_elo - away_team_elo + expected_advantage
-        # difference between true and expected points is halved
-        # the assumption is that both teams share the 'fault' for the difference equally
-        delta_points_diff = (true_points_diff - expected_points_diff) / 2
-
-        home_home_form = self.teams_form[self.teams_form.team_id == game.home_team_id]\
-                                ['home_delta'].values[0]
-        away_away_form = self.teams_form[self.teams_form.team_id == game.away_team_id]\
-                                ['away_delta'].values[0]
-        home_away_form = self.teams_form[self.teams_form.team_id == game.home_team_id]\
-                                ['away_delta'].values[0]
-        away_home_form = self.teams_form[self.teams_form.team_id == game.away_team_id]\
-                                ['home_delta'].values[0]
-
-        home_home_new = (1 - self.form_lr)*home_home_form - self.form_lr*delta_points_diff
-        away_away_new = (1 - self.form_lr)*away_away_form + self.form_lr*delta_points_diff
-
-        home_home_t = self.teams_form[self.teams_form.team_id == game.home_team_id]\
-                                ['home_t'].values[0] + 1
-        home_away_t = self.teams_form[self.teams_form.team_id == game.home_team_id]\
-                                ['away_t'].values[0]
-        away_away_t = self.teams_form[self.teams_form.team_id == game.away_team_id]\
-                                ['away_t'].values[0] + 1
-        away_home_t = self.teams_form[self.teams_form.team_id == game.away_team_id]\
-                                ['home_t'].values[0]
-        
-        self.teams_form.loc[self.teams_form.team_id == game.home_team_id,
-                            ['home_delta', 'home_t']] = [home_home_new, home_home_t]
-        self.teams_form.loc[self.teams_form.team_id == game.away_team_id,
-                            ['away_delta', 'away_t']] = [away_away_new, away_away_t]
-
-        calibrating_game = (home_home_t + home_away_t <= rounds_to_calibrate)|(away_home_t + away_away_t <= rounds_to_calibrate)
-
-        if not calibrating_game:
-            # update goals_given_points for future use
-            points_diff = (home_team_elo + home_home_new) - (away_team_elo + away_away_new)
-            self.__goals_given_points_new.append({'ft_home': game.ft_home,
-                                                  'ft_away': game.ft_away,
-                                                  'ht_home': game.ht_home,
-                                                  'ht_away': game.ht_away,
-                                                  'points_diff': points_diff,
-                                                  'league_id': game.league_id,
-                                                  'season': game.season,
-                                                  'date': game.date})
-
-        self.__update_list.append({'team_id': game.home_team_id,
-                                   'league_id': game.league_id,
-                                   'elo_rating': self.__teams_ratings[game.home_team_id],
-                                   'home_delta': home_home_new,
-                                   'away_delta': home_away_form,
-                                   'home_t': home_home_t,
-                                   'away_t': home_away_t,
-                                   'calibrating_game': calibrating_game,
-                                   'date': game.date})
-        self.__update_list.append({'team_id': game.away_team_id,
-                                   'league_id': game.league_id,
-                                   'elo_rating': self.__teams_ratings[game.away_team_id],
-                                   'home_delta': away_home_form,
-                                   'away_delta': away_away_new,
-                                   'home_t': away_home_t,
-                                   'away_t': away_away_t,
-                                   'calibrating_game': calibrating_game,
-                                   'date': game.date})
-        
-    def __W_e(self, dr, q=400):
-        return 1 / (10**(-dr/q) + 1)
-    
-    def __update_stats(self):
-        self.teams_elo_score = self.teams_elo_score.append(pd.DataFrame.from_dict(self.__update_list), ignore_index=True)   
-        self.__update_list = []
+    def __update_stats(self, season, ratings_history, goals_given_points_new):
+        """ Adds the new rows of the history tables of 'season', in memory and to their stores.
+        """
+        margin_given_points_new = pd.DataFrame.from_dict(self.__margin_given_points_new)
+        self.__margin_given_points_new = []
 
-        self.goals_given_points = self.goals_given_points.append(pd.DataFrame.from_dict(self.__goals_given_points_new), ignore_index=True)
-        self.__goals_given_points_new = []
+        # the in-memory ratings history is only kept up to date if it was loaded
+        if self.__teams_elo_score is not None:
+            self.teams_elo_score = self.__teams_elo_score.append(ratings_history, ignore_index=True)
+        self.__current_ratings = self.__latest_entries(self.current_ratings.append(ratings_history, ignore_index=True))
+        self.__rating_index = None
+        self.__current_state_date = None
+        self.goals_given_points = self.goals_given_points.append(goals_given_points_new, ignore_index=True)
+        self.margin_given_points = self.margin_given_points.append(margin_given_points_new, ignore_index=True)
+
+        for table, new_rows in [('teams_elo', ratings_history), ('goals_given_points', goals_given_points_new), ('margin_given_points', margin_given_points_new)]:
+            if len(new_rows) == 0:
+                continue
+            if self.ephemeral:
+                self.__pending_appends.append((table, new_rows, season))
+            else:
+                self.__write_history_rows(table, new_rows, season)
 
-        self.margin_given_points = self.margin_given_points.append(pd.DataFrame.from_dict(self.__margin_given_points_new), ignore_index=True)
-        self.__margin_given_points_new = []
+    def __write_history_rows(self, table, new_rows, season):
+        # rows are only downcast to the stored dtypes on write - the in-memory tables keep their computed precision
+        self.__history_stores[table].append(new_rows.astype(dtype=self._HISTORY_TABLES[table][1]), [season] * len(new_rows))
+        if table == 'teams_elo' and self.__teams_elo_score is None:
+            self.__computed_ratings_rows.append(new_rows)
 
     def __save_stats(self):
-        self.teams_elo_score.to_csv(self._ELO_RATINGS_CSV_PATH, index_label=False)
+        # the form and current ratings tables hold one row per team and are small enough to be rewritten
         self.teams_form.to_csv(self._TEAMS_FORM_CSV_PATH, index_label=False)
-        self.goals_given_points.to_csv(self._GOALS_GIVEN_POINTS_CSV_PATH, index_label=False)
-        self.margin_given_points.to_csv(self._MARGIN_GIVEN_POINTS_CSV_PATH, index_label=False)
-
-    def __initialize_elo_ratings(self, team_ids_this_season, current_season):
-        season_start_date = datetime(int(current_season / 1e4), 7, 1)
-
-        def get_team_starting_entry(team_id):
-            last_season = current_season - 10001
-            league_id_last_season = self.db.games[(self.db.games.season == last_season)&\
-                                                  (self.db.games.home_team_id == team_id)]['league_id']
-            league_id_this_season = self.db.games[(self.db.games.season == current_season)&\
-                                                  (self.db.games.home_team_id == team_id)]['league_id'].values[0]
-
-            # use last elo rating team got in the previous season if they stayed in the same league
-            # initialize with league default otherwise
-            if len(league_id_last_season) == 0 or league_id_last_season.values[0] != league_id_this_season:
-                team_starting_rating = self.leagues_init_points[self.leagues_init_points.league_id == league_id_this_season]['starting_points'].values[0]
-            else:
-                team_starting_rating = self.teams_elo_score[self.teams_elo_score.team_id == team_id].sort_values('date', ascending=False)['elo_rating'].values[0]
-
-            return {'team_id': team_id,
-                    'league_id': league_id_this_season,
-                    'elo_rating': team_starting_rating,
-                    'home_delta': 0.,
-                    'away_delta': 0.,
-                    'home_t': 0,
-                    'away_t': 0,
-                    'calibrating_game': True,
-                    'date': season_start_date}
-
-        teams_ratings_new_entries = [get_team_starting_entry(tid) for tid in team_ids_this_season]
-        self.teams_elo_score = self.teams_elo_score.append(pd.DataFrame.from_dict(teams_ratings_new_entries), ignore_index=True)
-        self.__save_stats()
+        self.current_ratings.to_csv(self._CURRENT_RATINGS_CSV_PATH, index_label=False)
+
+    @staticmethod
+    def __latest_entries(ratings):
+        # entries sharing a date keep their order, so the last one is kept - as in rating index lookups
+        return ratings.sort_values('date', kind='mergesort').drop_duplicates('team_id', keep='last').reset_index(drop=True)
+
+    def __load_history_table(self, table):
+        dtypes = self._HISTORY_TABLES[table][1]
+        store = self.__history_stores[table]
+        if store.exists():
+            rows = store.load()
+        elif self.ephemeral:
+            rows = self.__history_csv_rows(table)
+        else:
+            rows = self.__migrate_history_table(table)
+
+        # stored rows are read at their stored precision, as in a fresh process, except for the ratings rows written since
+        # the last compaction - they are the last rows of the store and are taken as they were computed. Rows not committed
+        # yet (in ephemeral mode) are only held in memory
+        computed_rows = []
+        if table == 'teams_elo':
+            computed_rows, self.__computed_ratings_rows = self.__computed_ratings_rows, []
+            rows = rows.iloc[:len(rows) - sum(len(new_rows) for new_rows in computed_rows)]
+        pending_rows = [new_rows for pending_table, new_rows, _ in self.__pending_appends if pending_table == table]
+        return pd.concat([rows.astype(dtype=dtypes)] + computed_rows + pending_rows, ignore_index=True)
+
+    def __migrate_history_table(self, table):
+        # move the table from its csv file into the store on first use
+        rows = self.__history_csv_rows(table)
+        self.__history_stores[table].append(rows, self.__rows_seasons(rows))
+        return rows
+
+    def __history_csv_rows(self, table):
+        csv_path, dtypes = self._HISTORY_TABLES[table]
+        return pd.read_csv(csv_path, parse_dates=['date']) if os.path.isfile(csv_path) else pd.DataFrame([], columns=list(dtypes))
+
+    def __rows_seasons(self, rows):
+        if 'season' in rows.columns:
+            return rows.season.values
+        return rows.date.map({date: int(self.db.date_to_season(pd.Timestamp(date))) for date in rows.date.unique()}).values
+
+    def __initialize_elo_ratings(self, current_season):
+        # teams keep the last elo rating they got in the previous season if they stayed in the same league
+        # and are initialized with the league default otherwise
+        starting_entries = season_starting_ratings(self.db.games, current_season,
+                                                   self.leagues_init_points.set_index('league_id')['starting_points'],
+                                                   self.rating_index.latest())
+        starting_entries = starting_entries.assign(home_delta=0., away_delta=0., home_t=0, away_t=0,
+                                                   calibrating_game=True, date=season_start_date(current_season))
+
+        self.__update_stats(current_season, starting_entries, pd.DataFrame([]))
+        if not self.ephemeral:
+            self.__save_stats()
 
     def __update_margin_exp_value_given_sign(self):
-        leagues_mevgs = []
-        for league_id in range(len(self.db.leagues)):
-            all_league_games = self.db.games[(self.db.games.league_id == league_id)][['ft_home', 'ft_away', 'date', 'league_id',
-                                                                                      'ht_home', 'ht_away', 'season',
-                                                                                      'home_team_id', 'away_team_id',
-                                                                                      ]].copy()
-        
-            all_league_games['margin'] = (all_league_games.ft_home - all_league_games.ft_away).apply('abs')
-            all_league_games['sign'] = all_league_games.apply(lambda x: 'X' if x.ft_home == x.ft_away\
-                                                                else str(int(x.ft_home < x.ft_away) + 1),
-                                                            axis = 1)
-
-            probs_margins = {}
-            margin_exp_value_given_sign = {}
-            for sign in ['1', '2']:
-                counts = all_league_games[all_league_games.sign == sign]['margin'].value_counts().sort_index() 
-                margins = np.hstack([counts.index.values[:6], np.array(['>5'])])
-                percents = np.hstack([counts.values[:6], np.sum(counts.values[6:])]) /\
-                                    len(all_league_games[all_league_games.sign == sign])
-
-                probs_margins[sign] = {k: v for k, v in zip(margins, percents)}
-
-                margin_exp_value_given_sign[sign] = np.sum(np.array([int(m.replace('>5', '6'))\
-                                                         for m in probs_margins[sign].keys()])*\
-                                                                   np.array(list(probs_margins[sign].values())))
-
-                margin_exp_value_given_sign['league_id'] = league_id
-
-            leagues_mevgs.append(margin_exp_value_given_sign)
-
-        pd.DataFrame.from_dict(leagues_mevgs).to_csv(self._MARGINS_EXP_GIVEN_SIGN_PATH, index_label=False)
+        """ Recomputes the expected margin of home ('1') and away ('2') wins per league, with margins above 5 counted as 6.
+            Margins are counted per league and season, and only the seasons whose number of played games changed since
+            the last refresh are counted again.
+        """
+        games = self.db.games.dropna(subset=['ft_home', 'ft_away'])
+        season_games = games.groupby(['league_id', 'season']).size().rename('season_games').reset_index()
+
+        def keys(table, columns=('league_id', 'season')):
+            return pd.MultiIndex.from_arrays([table[c].values for c in columns])
+
+        counts = self.margin_counts
+        # seasons counted on a different number of games than they have now
+        stale = season_games[~keys(season_games, ('league_id', 'season', 'season_games'))\
+                                    .isin(keys(counts, ('league_id', 'season', 'season_games')))]
+        if len(stale) > 0:
+            stale_games = games[keys(games).isin(keys(stale))]
+            counts = pd.concat([counts[~keys(counts).isin(keys(stale))], self.__count_margins(stale_games)], ignore_index=True)
+            self.__margin_counts = counts
+
+        wins = counts[counts.sign != 'X'].assign(total=lambda c: c.margin * c.games)
+        totals = wins.groupby(['league_id', 'sign'])[['total', 'games']].sum()
+        mevgs = (totals.total / totals.games).unstack('sign').reindex(columns=['1', '2']).reset_index()
+        mevgs.columns.name = None
+        self.__mevgs = mevgs
+
+        if not self.ephemeral and len(stale) > 0:
+            self.__save_margin_expectations()
+
+    @staticmethod
+    def __count_margins(games):
+        margins = (games.ft_home - games.ft_away).values.astype('int64')
+        counts = pd.DataFrame({'league_id': games.league_id.values,
+                               'season': games.season.values,
+                               'sign': np.where(margins > 0, '1', np.where(margins < 0, '2', 'X')),
+                               'margin': np.minimum(np.abs(margins), 6)})\
+                    .groupby(['league_id', 'season', 'sign', 'margin']).size().rename('games').reset_index()
+
+        # the number of games a season was counted on tells whether it has to be counted again
+        season_games = games.groupby(['league_id', 'season']).size().rename('season_games').reset_index()
+        return counts.merge(season_games, on=['league_id', 'season'])
+
+    def __save_margin_expectations(self):
+        self.margin_counts.to_csv(self._MARGIN_COUNTS_CSV_PATH, index=False)
+        self.margin_exp_value_given_sign.to_csv(self._MARGINS_EXP_GIVEN_SIGN_PATH, index_label=False)
 
     #def construct_ratings(self,
     #                      league_id,
@@ -0,0 +1,168 @@
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import Logging
+from .elo_engine import EloUpdateEngine, season_start_date, season_starting_ratings
+from .rating_index import RatingHistoryIndex
+from .similar_games import SimilarGamesIndex
+
+_GAMES_COLUMNS = ['ft_home', 'ft_away', 'date', 'league_id', 'ht_home', 'ht_away', 'season', 'home_team_id', 'away_team_id']
+
+def replay_elo_history(games,
+                       leagues_margins,
+                       margin_exp_value_given_sign,
+                       leagues_init_points,
+                       form_lr=0.2,
+                       k=20,
+                       calibration_rounds=8,
+                       init_calibration_rounds=20):
+    """ Builds the Elo ratings of all 'games' from scratch, season by season, the way EloRatingsProbabilityEstimator.update_data
+        does - but entirely in memory. Returns the ratings history (teams_elo_score) and the goals given points tables.
+    """
+    engine = EloUpdateEngine(leagues_margins, margin_exp_value_given_sign, form_lr, k)
+    init_points = leagues_init_points.set_index('league_id')['starting_points']
+    league_start_season = games.groupby('league_id')['season'].min()
+
+    ratings_history, goals_given_points = [], []
+    latest_ratings = pd.Series([], dtype='float64')
+    for season in sorted(games.season.unique()):
+        starting_entries = season_starting_ratings(games, season, init_points, latest_ratings)
+        starting_entries = starting_entries.assign(home_delta=0., away_delta=0., home_t=0, away_t=0,
+                                                   calibrating_game=True, date=season_start_date(season))
+        ratings_history.append(starting_entries[EloUpdateEngine._HISTORY_COLUMNS])
+
+        # start team form afresh in new season
+        teams_form = starting_entries[['team_id', 'home_delta', 'away_delta', 'home_t', 'away_t']]
+        engine.set_state(teams_form, starting_entries.set_index('team_id')['elo_rating'])
+
+        season_games = games[games.season == season].sort_values('date', ascending=True)
+        for league_id in season_games['league_id'].unique():
+            rounds_to_calibrate = calibration_rounds if season > league_start_season[league_id] else init_calibration_rounds
+            engine.update(season_games[season_games.league_id == league_id], rounds_to_calibrate)
+
+        season_history, season_goals = engine.flush()
+        ratings_history.append(season_history)
+        goals_given_points.append(season_goals)
+        latest_ratings = engine.ratings.combine_first(latest_ratings)
+
+    return pd.concat(ratings_history, ignore_index=True), pd.concat(goals_given_points, ignore_index=True)
+
+def score_elo_predictions(teams_elo_score, goals_given_points, games, delta_points_diff, use_form=True):
+    """ Returns the log loss and Brier score of the full time result (1/X/2) probabilities the Elo model gives 'games',
+        based on the ratings before each game and the similar past games in 'goals_given_points'.
+    """
+    rating_index = RatingHistoryIndex(teams_elo_score)
+    home_positions = rating_index.lookup(games.home_team_id.values, games.date.values, strict=True)
+    away_positions = rating_index.lookup(games.away_team_id.values, games.date.values, strict=True)
+
+    rated = (home_positions >= 0)&(away_positions >= 0)
+    games, home_positions, away_positions = games[rated], home_positions[rated], away_positions[rated]
+
+    points_diffs = rating_index.ratings[home_positions] - rating_index.ratings[away_positions]
+    if use_form:
+        points_diffs = points_diffs + rating_index.home_delta[home_positions] - rating_index.away_delta[away_positions]
+
+    similar_games = SimilarGamesIndex(goals_given_points)
+    probabilities = similar_games.probabilities(*similar_games.windows(points_diffs, delta_points_diff))
+    probabilities = np.column_stack([probabilities['1'], probabilities['X'], probabilities['2']])
+
+    results = np.column_stack([games.ft_home.values > games.ft_away.values,
+                               games.ft_home.values == games.ft_away.values,
+                               games.ft_home.values < games.ft_away.values]).astype('float64')
+
+    log_loss = -np.mean(np.log(np.clip(np.sum(probabilities * results, axis=1), 1e-15, 1.)))
+    brier = np.mean(np.sum((probabilities - results)**2, axis=1))
+    return log_loss, brier
+
+# games and league tables shared (read-only) by the sweep's worker processes
+_sweep_data = {}
+
+def _init_sweep_worker(sweep_data):
+    _sweep_data.update(sweep_data)
+
+def _run_parameter_set(params):
+    games, holdout_start = _sweep_data['games'], _sweep_data['holdout_start']
+    try:
+        teams_elo_score, goals_given_points = replay_elo_history(games,
+                                                                 _sweep_data['leagues_margins'],
+                                                                 _sweep_data['margin_exp_value_given_sign'],
+                                                                 _sweep_data['leagues_init_points'],
+                                                                 form_lr=params['form_lr'],
+                                                                 k=params['k'],
+                                                                 calibration_rounds=params['calibration_rounds'])
+
+        # only games played before the held-out games are used as similar games
+        log_loss, brier = score_elo_predictions(teams_elo_score,
+                                                goals_given_points[goals_given_points.date < holdout_start],
+                                                games[games.date >= holdout_start],
+                                                params['delta_points_diff'])
+        return dict(params, log_loss=log_loss, brier=brier, error=None)
+    except Exception as exc:
+        return dict(params, log_loss=np.nan, brier=np.nan, error=str(exc))
+
+class EloParameterSweep:
+    """Searches for the best parameters of the Elo ratings model. For every parameter set, the ratings history is replayed
+       from scratch in memory (nothing is written to the estimator's csv files) and the model is scored on the games of the
+       last 'holdout_seasons' seasons, using only similar games played before them. Parameter sets are evaluated in
+       parallel, with the games table shared once per worker process.
+
+       Parameters:
+           'football_database' - Database of past football games.
+           'estimator'         - EloRatingsProbabilityEstimator providing the league margins, expected margins and starting points.
+           'holdout_seasons'   - Number of most recent seasons on which each parameter set is scored.
+           'n_jobs'            - Number of worker processes. Defaults to the number of processors.
+
+       Example:
+           sweep = EloParameterSweep(db, EloRatingsProbabilityEstimator(db))
+           ranking = sweep.run({'form_lr': [0.1, 0.2, 0.3], 'delta_points_diff': [20, 30, 40], 'k': [15, 20, 25]})
+    """
+    _DEFAULT_PARAMS = {'form_lr': 0.2, 'delta_points_diff': 30, 'k': 20, 'calibration_rounds': 8}
+
+    def __init__(self, football_database, estimator, holdout_seasons=1, n_jobs=None, logger=None):
+        if holdout_seasons < 1:
+            raise ValueError('At least one season must be held out for scoring.')
+
+        self.db = football_database
+        self.estimator = estimator
+        self.holdout_seasons = holdout_seasons
+        self.n_jobs = n_jobs
+        self.logger = logger
+
+    def run(self, param_grid):
+        """ Evaluates every combination of the values in 'param_grid' (parameters left out keep their defaults) and returns
+            the parameter sets ranked by log loss.
+        """
+        unknown_params = [p for p in param_grid if p not in self._DEFAULT_PARAMS]
+        if len(unknown_params) > 0:
+            raise ValueError(f'Unknown Elo parameters {unknown_params}. Valid parameters are {list(self._DEFAULT_PARAMS)}.')
+
+        grid = dict(self._DEFAULT_PARAMS, **param_grid)
+        grid = {name: values if isinstance(values, (list, tuple, np.ndarray)) else [values] for name, values in grid.items()}
+        param_sets = [dict(zip(grid.keys(), values)) for values in itertools.product(*grid.values())]
+
+        games = self.db.games.dropna(subset=['ft_home', 'ft_away'])[_GAMES_COLUMNS]
+        seasons = sorted(games.season.unique())
+        if len(seasons) <= self.holdout_seasons:
+            raise ValueError(f'Cannot hold out {self.holdout_seasons} seasons out of {len(seasons)}.')
+        holdout_start = games[games.season >= seasons[-self.holdout_seasons]].date.min()
+
+        sweep_data = {'games': games,
+                      'holdout_start': holdout_start,
+                      'leagues_margins': self.estimator.leagues_margins,
+                      'margin_exp_value_given_sign': self.estimator.margin_exp_value_given_sign,
+                      'leagues_init_points': self.estimator.leagues_init_points}
+
+        with ProcessPoolExecutor(max_workers=self.n_jobs, initializer=_init_sweep_worker, initargs=(sweep_data,)) as executor:
+            results = pd.DataFrame.from_dict(list(executor.map(_run_parameter_set, param_sets)))
+
+        results = results.sort_values(['log_loss', 'brier'], na_position='last').reset_index(drop=True)
+        if self.logger is not None:
+            for _, row in results[~results.error.isna()].iterrows():
+                self.logger.log_message(f'Elo parameter set {row[list(grid.keys())].to_dict()} failed: {row.error}', Logging.WARNING)
+            best = results.iloc[0]
+            self.logger.log_message(f'Best Elo parameters {best[list(grid.keys())].to_dict()} - log loss {best.log_loss:.4f}, ' +\
+                                    f'Brier score {best.brier:.4f}', Logging.INFO)
+
+        return results
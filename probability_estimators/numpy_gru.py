@@ -0,0 +1,154 @@
+import json
+import numpy as np
+
+_ACTIVATIONS = {'linear': lambda x: x,
+                'relu': lambda x: np.maximum(x, 0.),
+                'exp': np.exp,
+                'tanh': np.tanh,
+                'sigmoid': lambda x: 1. / (1. + np.exp(-x)),
+                'hard_sigmoid': lambda x: np.clip(0.2 * x + 0.5, 0., 1.)}
+
+def _activation(name):
+    if name not in _ACTIVATIONS:
+        raise ValueError(f'Activation {name} is not supported by the numpy backend. Supported activations are {list(_ACTIVATIONS)}.')
+    return _ACTIVATIONS[name]
+
+def _activation_name(activation):
+    # activations are serialized by name, or as a dict holding the name in newer versions of Keras
+    if isinstance(activation, dict):
+        activation = activation.get('config', {}).get('name', activation.get('class_name'))
+    return str(activation).split('.')[-1]
+
+def export_model_weights(model, filepath):
+    """ Writes the weights and layer configuration of a Keras Sequential model built of GRU, Dense, BatchNormalization and
+        Activation layers to a numpy archive, which NumpySequentialModel.load runs without TensorFlow.
+    """
+    layers, arrays = [], {}
+    for i, layer in enumerate(model.layers):
+        config = layer.get_config()
+        spec = {'type': type(layer).__name__}
+        weights = layer.get_weights()
+
+        if spec['type'] == 'GRU':
+            spec.update({'activation': _activation_name(config.get('activation', 'tanh')),
+                         'recurrent_activation': _activation_name(config.get('recurrent_activation', 'sigmoid')),
+                         'reset_after': bool(config.get('reset_after', False)),
+                         'return_sequences': bool(config.get('return_sequences', False))})
+            names = ['kernel', 'recurrent_kernel', 'bias'][:len(weights)]
+        elif spec['type'] == 'Dense':
+            spec['activation'] = _activation_name(config.get('activation', 'linear'))
+            names = ['kernel', 'bias'][:len(weights)]
+        elif spec['type'] == 'BatchNormalization':
+            spec['epsilon'] = float(config['epsilon'])
+            names = (['gamma'] if config.get('scale', True) else []) + (['beta'] if config.get('center', True) else []) +\
+                    ['moving_mean', 'moving_variance']
+        elif spec['type'] == 'Activation':
+            spec['activation'] = _activation_name(config['activation'])
+            names = []
+        else:
+            raise ValueError(f'Layer {layer.name} of type {spec["type"]} is not supported by the numpy backend.')
+
+        _activation(spec.get('activation', 'linear'))
+        layers.append(spec)
+        arrays.update({f'layer_{i}_{name}': values for name, values in zip(names, weights)})
+
+    # write through a file object, so that numpy does not append its own extension to the path
+    with open(filepath, 'wb') as fp:
+        np.savez(fp, layers=np.array(json.dumps(layers)), **arrays)
+
+class NumpySequentialModel:
+    """Forward pass of an exported Keras Sequential model (see export_model_weights) in plain numpy, for prediction
+       without a TensorFlow runtime. The input projections of a GRU layer are computed for all timesteps in one matmul,
+       leaving a single (batch, units) x (units, 3*units) matmul per timestep. Supports both GRU variants - with the
+       reset gate applied after the recurrent matmul (reset_after, the TensorFlow 2 default) and before it.
+
+       Example:
+           model = NumpySequentialModel.load(DB_PATH + 'goals_htft_weights.npz')
+           predictions = model.predict(games_array)
+    """
+    def __init__(self, layers, arrays):
+        self.layers = layers
+        self.arrays = arrays
+
+    @classmethod
+    def load(cls, filepath):
+        with np.load(filepath) as archive:
+            layers = json.loads(str(archive['layers']))
+            arrays = {name: archive[name].astype('float64') for name in archive.files if name != 'layers'}
+        return cls(layers, arrays)
+
+    def predict(self, inputs):
+        return self.__run_layers(np.asarray(inputs, dtype='float64'), range(len(self.layers)))
+
+    def advance_states(self, inputs, states=None):
+        """ Runs the first (GRU) layer over 'inputs' of shape (batch, timesteps, features), starting from 'states' (zeros if
+            None), and returns its states after the last timestep. With predict_from_states, this lets a caller keep the
+            states of sequences and feed only their new timesteps.
+        """
+        self.__check_recurrent_head()
+        inputs = np.asarray(inputs, dtype='float64')
+        if states is None:
+            states = np.zeros((inputs.shape[0], self.arrays['layer_0_recurrent_kernel'].shape[0]))
+        return self.__gru(inputs, self.layers[0], self.__layer_weights(0), states)[1]
+
+    def predict_from_states(self, states):
+        """ Returns the outputs of the model at the timesteps where the GRU layer reached 'states'.
+        """
+        self.__check_recurrent_head()
+        return self.__run_layers(np.asarray(states, dtype='float64'), range(1, len(self.layers)))
+
+    def __check_recurrent_head(self):
+        # the layers after the GRU must work on every timestep on its own for its states to determine the outputs
+        if self.layers[0]['type'] != 'GRU' or not self.layers[0]['return_sequences'] or any(spec['type'] == 'GRU' for spec in self.layers[1:]):
+            raise ValueError('Only models with a single GRU layer returning sequences, as their first layer, can be run from states.')
+
+    def __layer_weights(self, i):
+        return {name[len(f'layer_{i}_'):]: values for name, values in self.arrays.items() if name.startswith(f'layer_{i}_')}
+
+    def __run_layers(self, outputs, layer_indices):
+        for i in layer_indices:
+            spec, weights = self.layers[i], self.__layer_weights(i)
+
+            if spec['type'] == 'GRU':
+                sequences, states = self.__gru(outputs, spec, weights)
+                outputs = sequences if spec['return_sequences'] else states
+            elif spec['type'] == 'Dense':
+                outputs = _activation(spec['activation'])(outputs @ weights['kernel'] + weights.get('bias', 0.))
+            elif spec['type'] == 'BatchNormalization':
+                outputs = (outputs - weights['moving_mean']) / np.sqrt(weights['moving_variance'] + spec['epsilon'])
+                outputs = outputs * weights.get('gamma', 1.) + weights.get('beta', 0.)
+            else:
+                outputs = _activation(spec['activation'])(outputs)
+
+        return outputs
+
+    @staticmethod
+    def __gru(inputs, spec, weights, state=None):
+        kernel, recurrent_kernel = weights['kernel'], weights['recurrent_kernel']
+        units = recurrent_kernel.shape[0]
+        activation, recurrent_activation = _activation(spec['activation']), _activation(spec['recurrent_activation'])
+
+        bias = weights.get('bias', np.zeros(3 * units))
+        input_bias, recurrent_bias = (bias[0], bias[1]) if spec['reset_after'] else (bias, np.zeros(3 * units))
+
+        # gates are ordered update (z), reset (r), candidate (h) in the kernels
+        projected = inputs @ kernel + input_bias
+        n_timesteps = inputs.shape[1]
+
+        state = np.zeros((inputs.shape[0], units)) if state is None else state
+        outputs = np.empty((inputs.shape[0], n_timesteps, units))
+        for t in range(n_timesteps):
+            x_z, x_r, x_h = np.split(projected[:, t], 3, axis=-1)
+            if spec['reset_after']:
+                h_z, h_r, h_h = np.split(state @ recurrent_kernel + recurrent_bias, 3, axis=-1)
+                z, r = recurrent_activation(x_z + h_z), recurrent_activation(x_r + h_r)
+                candidate = activation(x_h + r * h_h)
+            else:
+                h_z, h_r = np.split(state @ recurrent_kernel[:, :2 * units], 2, axis=-1)
+                z, r = recurrent_activation(x_z + h_z), recurrent_activation(x_r + h_r)
+                candidate = activation(x_h + (r * state) @ recurrent_kernel[:, 2 * units:])
+
+            state = z * state + (1. - z) * candidate
+            outputs[:, t] = state
+
+        return outputs, state
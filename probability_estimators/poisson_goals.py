@@ -0,0 +1,210 @@
+import numpy as np
+
+from .similar_games import _market_indicators, _with_under_markets
+from .score_grid import _HT_MARKETS, _HTFT_MARKETS
+
+def _fit_poisson_regression(x, y, max_iter=25, tol=1e-8):
+    """ Fits log(E[y]) = b0 + b1*x by iteratively reweighted least squares and returns [b0, b1].
+    """
+    X = np.column_stack([np.ones(len(x)), x])
+    beta = np.array([np.log(max(y.mean(), 1e-3)), 0.])
+    for _ in range(max_iter):
+        mu = np.exp(X @ beta)
+        z = X @ beta + (y - mu) / mu
+        beta_new = np.linalg.solve((X.T * mu) @ X, (X.T * mu) @ z)
+        converged = np.max(np.abs(beta_new - beta)) < tol
+        beta = beta_new
+        if converged:
+            break
+    return beta
+
+class PoissonGoalsModel:
+    """Parametric alternative to the similar games window of the Elo ratings model. For every league, the expected number
+       of goals each team scores in each half is fitted as a smooth function of the points difference of the teams (a
+       Poisson regression with log link), so pricing a game is a closed-form evaluation instead of a search over past games.
+       Each team's goals in each half are Poisson distributed around their fitted means, independently of each other, so
+       every market is summed over a small two-dimensional grid - full time markets over the full time score, half-time
+       markets over the half-time score, second half markets over the second half score and half-time/full time markets
+       over the goal differences of the two halves. Markets are only summed at whole points differences, into a table per
+       league that games are priced from by interpolation.
+
+       Parameters:
+           'goals_given_points' - Table of past games with their goals and the teams' points difference.
+           'min_games'          - Leagues with fewer games use the regression fitted on all leagues.
+           'max_goals'          - Number of goals per team and half that the score grid goes up to (exclusive).
+
+       Example:
+           model = PoissonGoalsModel(estimator.goals_given_points)
+           probabilities = model.probabilities(games.league_id.values, points_diffs)
+    """
+    _TARGETS = ['ht_home', 'ht_away', 'sh_home', 'sh_away']
+    # points differences are scaled down so that both coefficients are of similar magnitude during fitting
+    _POINTS_SCALE = 100.
+    _ARRAYS = ['league_ids', 'coefs', 'pooled_coefs']
+    # spacing of the points differences in the tables of market probabilities - interpolating between them stays within
+    # 1e-5 of pricing every game on its own score grids
+    _TABLE_STEP = 1.
+    _MAX_TABLED_POINTS_DIFF = 5000.
+
+    def __init__(self, goals_given_points=None, min_games=200, max_goals=8):
+        self.max_goals = max_goals
+        self.__build_score_grid()
+        # tables of market probabilities by points difference, built as games need them - {coef row: (first step, table)}
+        self.__tables = {}
+        if goals_given_points is None:
+            return
+
+        games = goals_given_points[~goals_given_points.points_diff.isna()]
+        points_diff = games.points_diff.values.astype('float64') / self._POINTS_SCALE
+        goals = np.column_stack([games.ht_home.values, games.ht_away.values,
+                                 games.ft_home.values - games.ht_home.values,
+                                 games.ft_away.values - games.ht_away.values]).astype('float64')
+
+        self.pooled_coefs = np.stack([_fit_poisson_regression(points_diff, goals[:, j]) for j in range(len(self._TARGETS))])
+
+        league_ids, coefs = [], []
+        for league_id in np.unique(games.league_id.values):
+            in_league = games.league_id.values == league_id
+            if in_league.sum() < min_games:
+                continue
+            league_ids.append(league_id)
+            coefs.append(np.stack([_fit_poisson_regression(points_diff[in_league], goals[in_league, j]) for j in range(len(self._TARGETS))]))
+
+        self.league_ids = np.array(league_ids, dtype='int64')
+        self.coefs = np.stack(coefs) if len(coefs) > 0 else np.zeros((0, len(self._TARGETS), 2))
+
+    @classmethod
+    def from_arrays(cls, arrays, max_goals=8):
+        model = cls(max_goals=max_goals)
+        for name in cls._ARRAYS:
+            setattr(model, name, arrays[name])
+        return model
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self._ARRAYS}
+
+    def means(self, league_ids, points_diffs):
+        """ Returns the expected goals of the home and away teams in the first and second half of each game, as an array
+            with columns ordered as _TARGETS.
+        """
+        return self.__means(self.__coef_rows(league_ids), points_diffs)
+
+    def probabilities(self, league_ids, points_diffs):
+        """ Returns the probability of every market outcome in the given games, as a dict of arrays keyed by market - in
+            the same order as SimilarGamesIndex.probabilities. Probabilities are interpolated linearly between the whole
+            points differences of each league's table of market probabilities, which only grows when a game falls outside
+            it, so pricing costs about as much as a lookup in the similar games window.
+        """
+        coef_rows = self.__coef_rows(league_ids)
+        points_diffs = np.asarray(points_diffs).astype('float64')
+
+        frequencies = np.empty((len(points_diffs), len(self.markets)))
+        # games too far from the rest to be worth tabulating are priced on their own
+        tabled = np.abs(points_diffs) <= self._MAX_TABLED_POINTS_DIFF
+        for row in np.unique(coef_rows[tabled]):
+            in_group = tabled & (coef_rows == row)
+            frequencies[in_group] = self.__interpolate(row, points_diffs[in_group])
+        if not tabled.all():
+            frequencies[~tabled] = self.__grid_probabilities(self.__means(coef_rows[~tabled], points_diffs[~tabled]))
+
+        return _with_under_markets(self.markets, frequencies)
+
+    def __coef_rows(self, league_ids):
+        # row of every league in coefs, or -1 for leagues priced with the pooled regression
+        league_ids = np.asarray(league_ids).astype('int64')
+        ranks = np.searchsorted(self.league_ids, league_ids)
+        fitted = ranks < len(self.league_ids)
+        fitted[fitted] = self.league_ids[ranks[fitted]] == league_ids[fitted]
+        return np.where(fitted, ranks, -1)
+
+    def __means(self, coef_rows, points_diffs):
+        points_diffs = np.asarray(points_diffs).astype('float64') / self._POINTS_SCALE
+        coefs = np.concatenate([self.coefs, self.pooled_coefs[None]])[coef_rows]
+        return np.exp(coefs[:, :, 0] + coefs[:, :, 1] * points_diffs[:, None])
+
+    def __interpolate(self, coef_row, points_diffs):
+        positions = points_diffs / self._TABLE_STEP
+        lower = np.floor(positions).astype('int64')
+        start, table = self.__table(coef_row, lower.min(), lower.max() + 1)
+
+        weights = (positions - lower)[:, None]
+        return table[lower - start] * (1. - weights) + table[lower - start + 1] * weights
+
+    def __table(self, coef_row, first, last):
+        """ Returns the first step and the market probabilities of the table of 'coef_row', extended to cover the steps
+            from 'first' to 'last'.
+        """
+        start, table = self.__tables.get(coef_row, (first, np.empty((0, len(self.markets)))))
+        end = start + len(table)
+
+        def rows(steps):
+            return self.__grid_probabilities(self.__means(np.full(len(steps), coef_row), steps * self._TABLE_STEP))
+
+        if first < start:
+            table, start = np.concatenate([rows(np.arange(first, start)), table]), first
+        if last >= end:
+            table = np.concatenate([table, rows(np.arange(end, last + 1))])
+
+        self.__tables[coef_row] = (start, table)
+        return start, table
+
+    def __grid_probabilities(self, means):
+        """ Returns the probabilities of the markets (columns ordered as self.markets) given the goal means of games.
+        """
+        # Poisson probabilities of 0..max_goals-1 goals for every team and half, renormalized over the truncated range
+        ngoals = np.arange(self.max_goals)
+        log_factorials = np.cumsum(np.log(np.maximum(ngoals, 1)))
+        pmf = np.exp(ngoals * np.log(means[:, :, None]) - means[:, :, None] - log_factorials)
+        pmf /= pmf.sum(axis=2, keepdims=True)
+        ht_home, ht_away, sh_home, sh_away = pmf[:, 0], pmf[:, 1], pmf[:, 2], pmf[:, 3]
+
+        # full time goals are the sums of the goals in both halves, and the results of the halves follow their goal differences
+        grids = {'ft': self.__joint(self.__sum_distribution(ht_home, sh_home), self.__sum_distribution(ht_away, sh_away)),
+                 'ht': self.__joint(ht_home, ht_away),
+                 'sh': self.__joint(sh_home, sh_away),
+                 'htft': self.__joint(self.__sum_distribution(ht_home, ht_away[:, ::-1]), self.__sum_distribution(sh_home, sh_away[:, ::-1]))}
+
+        frequencies = np.empty((len(means), len(self.markets)))
+        for grid, (columns, masks) in self.__market_masks.items():
+            frequencies[:, columns] = grids[grid] @ masks
+        return frequencies
+
+    @staticmethod
+    def __joint(home, away):
+        # joint distribution of two independent variables, flattened as (home, away)
+        return (home[:, :, None] * away[:, None, :]).reshape(len(home), -1)
+
+    @staticmethod
+    def __sum_distribution(first, second):
+        # distribution of the sum of two independent goal counts - with 'second' reversed, of their difference (shifted by
+        # max_goals-1)
+        distribution = np.zeros((len(first), first.shape[1] + second.shape[1] - 1))
+        for i in range(first.shape[1]):
+            distribution[:, i:i + second.shape[1]] += first[:, i:i + 1] * second
+        return distribution
+
+    def __build_score_grid(self):
+        n_sums = 2 * self.max_goals - 1
+        home, away = [g.ravel() for g in np.indices((self.max_goals,) * 2)]
+
+        ft_home, ft_away = [g.ravel() for g in np.indices((n_sums,) * 2)]
+        # goal differences of the halves, as the smallest scores having them
+        ht_diff, sh_diff = [g.ravel() - (self.max_goals - 1) for g in np.indices((n_sums,) * 2)]
+        ht_home_min, ht_away_min = np.maximum(ht_diff, 0), np.maximum(-ht_diff, 0)
+        indicators = {'ft': _market_indicators(ft_home, ft_away, np.zeros_like(ft_home), np.zeros_like(ft_away)),
+                      'ht': _market_indicators(home, away, home, away),
+                      'sh': _market_indicators(home, away, np.zeros_like(home), np.zeros_like(away)),
+                      'htft': _market_indicators(ht_home_min + np.maximum(sh_diff, 0), ht_away_min + np.maximum(-sh_diff, 0),
+                                                 ht_home_min, ht_away_min)}
+
+        def grid_of(market):
+            if market in _HT_MARKETS:
+                return 'ht'
+            if market in _HTFT_MARKETS:
+                return 'sh' if market.startswith('second_half') else 'htft'
+            return 'ft'
+
+        self.markets = list(indicators['ft'].keys())
+        grids = [grid_of(market) for market in self.markets]
+        self.__market_masks = {grid: (np.array([j for j, g in enumerate(grids) if g == grid]),
+                                      np.column_stack([indicators[grid][m] for m, g in zip(self.markets, grids) if g == grid]).astype('float64'))                                    for grid in indicators}
@@ -0,0 +1,117 @@
+import numpy as np
+import pandas as pd
+
+class RatingHistoryIndex:
+    """Per-team, date sorted index over a ratings history table (teams_elo_score). The entries of each team are stored
+       contiguously (CSR layout - 'offsets' marks where every team's entries start), so finding the rating a team had at
+       a given date is a binary search over that team's dates instead of masking and sorting the whole table.
+       Ratings and form deltas keep the dtypes of the table they were built from.
+
+       Entries sharing a date keep their order in the table, and as-of lookups return the last of them.
+
+       Example:
+           index = RatingHistoryIndex(teams_elo_score)
+           positions = index.lookup(games.home_team_id.values, games.date.values, strict=True)
+           ratings = index.ratings[positions]
+    """
+    _ARRAYS = ['team_ids', 'offsets', 'dates', 'ratings', 'home_delta', 'away_delta']
+
+    def __init__(self, teams_elo_score=None):
+        if teams_elo_score is None:
+            return
+
+        team_ids = teams_elo_score.team_id.values
+        dates = teams_elo_score.date.values.astype('datetime64[ns]')
+        order = np.lexsort((dates, team_ids))
+
+        self.team_ids, starts = np.unique(team_ids[order], return_index=True)
+        self.offsets = np.append(starts, len(order)).astype('int64')
+
+        self.dates = dates[order]
+        self.ratings = teams_elo_score.elo_rating.values[order]
+        self.home_delta = teams_elo_score.home_delta.values[order]
+        self.away_delta = teams_elo_score.away_delta.values[order]
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        index = cls()
+        for name in cls._ARRAYS:
+            setattr(index, name, arrays[name])
+        return index
+
+    def to_arrays(self):
+        return {name: getattr(self, name) for name in self._ARRAYS}
+
+    def latest_index(self):
+        """ Returns an index holding only the latest entry of every team - enough to look up ratings at any date after them.
+        """
+        positions = self.offsets[1:] - 1
+        return self.from_arrays({'team_ids': self.team_ids,
+                                 'offsets': np.arange(len(positions) + 1, dtype='int64'),
+                                 'dates': self.dates[positions],
+                                 'ratings': self.ratings[positions],
+                                 'home_delta': self.home_delta[positions],
+                                 'away_delta': self.away_delta[positions]})
+
+    def __len__(self):
+        return len(self.dates)
+
+    def lookup(self, team_ids, dates, strict=False):
+        """ Returns the positions of the latest entries of 'team_ids' dated on or before (before, if 'strict') the
+            respective 'dates', or -1 where a team has no such entry.
+        """
+        team_ids = np.asarray(team_ids)
+        dates = np.asarray(dates).astype('datetime64[ns]')
+        positions = np.full(len(team_ids), -1, dtype='int64')
+
+        team_ranks = np.searchsorted(self.team_ids, team_ids)
+        known = (team_ranks < len(self.team_ids))
+        known[known] = self.team_ids[team_ranks[known]] == team_ids[known]
+
+        side = 'left' if strict else 'right'
+        for rank in np.unique(team_ranks[known]):
+            queries = known & (team_ranks == rank)
+            start, end = self.offsets[rank], self.offsets[rank + 1]
+            team_positions = start + np.searchsorted(self.dates[start:end], dates[queries], side=side) - 1
+            positions[queries] = np.where(team_positions >= start, team_positions, -1)
+
+        return positions
+
+    def iter_snapshots(self, dates, strict=False):
+        """ Yields, for each of the sorted 'dates', the position of every team's latest entry dated on or before (before,
+            if 'strict') that date, or -1 where the team has no such entry. Positions are aligned with 'team_ids'.
+            The entries are swept once in date order, so a whole series of dates costs about as much as a single one.
+        """
+        dates = np.asarray(dates).astype('datetime64[ns]')
+        if (np.diff(dates) < np.timedelta64(0, 'ns')).any():
+            raise ValueError('Snapshot dates must be sorted in ascending order.')
+
+        team_ranks = np.repeat(np.arange(len(self.team_ids)), np.diff(self.offsets))
+        # entries sharing a date keep their index order, so the last one assigned is the one lookup would return
+        order = np.lexsort((np.arange(len(self)), self.dates))
+        sorted_dates = self.dates[order]
+
+        positions = np.full(len(self.team_ids), -1, dtype='int64')
+        swept = 0
+        side = 'left' if strict else 'right'
+        for date in dates:
+            end = np.searchsorted(sorted_dates, date, side=side)
+            if end > swept:
+                new_entries = order[swept:end]
+                # keep only the last new entry of every team
+                ranks, last = np.unique(team_ranks[new_entries][::-1], return_index=True)
+                positions[ranks] = new_entries[::-1][last]
+                swept = end
+            yield positions.copy()
+
+    def rating_at(self, team_id, date, strict=False):
+        position = self.lookup([team_id], [np.datetime64(pd.Timestamp(date), 'ns')], strict)[0]
+        if position < 0:
+            raise ValueError(f'No elo rating recorded for team with id {team_id} ' + ('before ' if strict else 'on or before ') + f'{date}.')
+        return self.ratings[position]
+
+    def latest(self, team_ids=None):
+        """ Returns the latest ratings of 'team_ids' (all teams if None), as a Series indexed by team id.
+        """
+        latest = pd.Series(self.ratings[self.offsets[1:] - 1], index=self.team_ids)
+        return latest if team_ids is None else latest.reindex(team_ids)
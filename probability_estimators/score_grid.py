@@ -0,0 +1,64 @@
+import numpy as np
+
+from .similar_games import _market_indicators, _with_under_markets
+
+# markets priced from the half-time score alone, and from the half-time and second half scores together -
+# all others only depend on the full time score
+_HT_MARKETS = ['ht_1', 'ht_X', 'ht_2', 'first_half_btts_yes', 'first_half_btts_no', 'ht_1/X', 'ht_X/2', 'ht_1/2']
+_HTFT_MARKETS = ['second_half_btts_yes', 'second_half_btts_no', '1-1', '1-X', '1-2', 'X-1', 'X-X', 'X-2', '2-1', '2-X', '2-2']
+
+def _poisson_pmf(means, max_goals):
+    """ Returns the Poisson probabilities of 0..max_goals-1 goals for each of 'means' (along a new last axis). The last bin
+        holds the probability of max_goals-1 or more goals, so that every distribution sums to one.
+    """
+    ngoals = np.arange(max_goals)
+    log_factorials = np.cumsum(np.log(np.maximum(ngoals, 1)))
+    # a zero mean would make the log undefined - its distribution is all in the first bin either way
+    means = np.maximum(np.asarray(means, dtype='float64'), 1e-12)[..., None]
+
+    pmf = np.exp(ngoals * np.log(means) - means - log_factorials)
+    pmf[..., -1] = np.clip(1 - pmf[..., :-1].sum(axis=-1), 0., 1.)
+    return pmf
+
+def _market_masks(max_goals):
+    """ Returns the outcome indicators of every market over the score grid it is priced on, as {market: mask} in the
+        order of _market_indicators. Full time and half-time masks are flattened (home goals, away goals) grids, half-time/
+        full time masks flattened (ht home, ht away, second half home, second half away) grids.
+    """
+    home, away = [g.ravel() for g in np.indices((max_goals,) * 2)]
+    ft_indicators = _market_indicators(home, away, np.zeros_like(home), np.zeros_like(away))
+    ht_indicators = _market_indicators(home, away, home, away)
+
+    ht_home, ht_away, sh_home, sh_away = [g.ravel() for g in np.indices((max_goals,) * 4)]
+    htft_indicators = _market_indicators(ht_home + sh_home, ht_away + sh_away, ht_home, ht_away)
+
+    return {market: (htft_indicators if market in _HTFT_MARKETS else ht_indicators if market in _HT_MARKETS else ft_indicators)[market]\
+                for market in ft_indicators}
+
+def score_grid_probabilities(ft_means, ht_means, second_half_means, max_goals=8):
+    """ Prices every market for a batch of games from Poisson goal means. Builds the joint probability of the full time,
+        half-time and half-time/second half scores of all games at once, and sums each of them over the scores in which
+        a market outcome happens.
+
+        Parameters:
+            'ft_means'          - Array (games, 2) of the expected full time goals of the home and away teams.
+            'ht_means'          - Array (games, 2) of the expected half-time goals of the home and away teams.
+            'second_half_means' - Array (games, max_goals, max_goals, 2) of the expected second half goals of the home and
+                                  away teams, given the half-time score (home goals, away goals).
+
+        Returns a dict of arrays keyed by market, in the same order as SimilarGamesIndex.probabilities.
+    """
+    ft_pmf, ht_pmf = _poisson_pmf(ft_means, max_goals), _poisson_pmf(ht_means, max_goals)
+    sh_pmf = _poisson_pmf(second_half_means, max_goals)
+
+    n_games = len(ft_pmf)
+    ft_joint = np.einsum('nh,na->nha', ft_pmf[:, 0], ft_pmf[:, 1]).reshape(n_games, -1)
+    ht_joint = np.einsum('nh,na->nha', ht_pmf[:, 0], ht_pmf[:, 1])
+    htft_joint = np.einsum('nha,nhax,nhay->nhaxy', ht_joint, sh_pmf[..., 0, :], sh_pmf[..., 1, :]).reshape(n_games, -1)
+    ht_joint = ht_joint.reshape(n_games, -1)
+
+    masks = _market_masks(max_goals)
+    markets = list(masks.keys())
+    frequencies = np.column_stack([(htft_joint if market in _HTFT_MARKETS else ht_joint if market in _HT_MARKETS else ft_joint)\
+                                        @ masks[market].astype('float64') for market in markets])
+    return _with_under_markets(markets, frequencies)
@@ -0,0 +1,140 @@
+import numpy as np
+import warnings
+
+from constants import ACCEPTED_GOALS
+
+def _market_indicators(ft_home, ft_away, ht_home, ht_away):
+    """ Returns whether each market outcome happened in the given games, in the order the Elo estimator reports them.
+        Under markets of total goals are left out - their probabilities are the complements of the over markets.
+    """
+    btts = (ft_home > 0)&(ft_away > 0)
+    ft_1, ft_X, ft_2 = ft_home > ft_away, ft_home == ft_away, ft_home < ft_away
+    ht_1, ht_X, ht_2 = ht_home > ht_away, ht_home == ht_away, ht_home < ht_away
+    first_half_btts = (ht_home > 0)&(ht_away > 0)
+    second_half_btts = ((ft_home - ht_home) > 0)&((ft_away - ht_away) > 0)
+    tot_goals = ft_home + ft_away
+
+    indicators = {
+        # main
+        '1': ft_1, 'X': ft_X, '2': ft_2,
+        'btts_yes': btts, 'btts_no': ~btts,
+        # half
+        'ht_1': ht_1, 'ht_X': ht_X, 'ht_2': ht_2,
+        'first_half_btts_yes': first_half_btts, 'first_half_btts_no': ~first_half_btts,
+        'second_half_btts_yes': second_half_btts, 'second_half_btts_no': ~second_half_btts,
+        # double chance
+        '1/X': ft_1|ft_X, 'X/2': ft_X|ft_2, '1/2': ft_1|ft_2,
+        # ht double chance
+        'ht_1/X': ht_1|ht_X, 'ht_X/2': ht_X|ht_2, 'ht_1/2': ht_1|ht_2,
+        # ht-ft
+        '1-1': ht_1&ft_1, '1-X': ht_1&ft_X, '1-2': ht_1&ft_2,
+        'X-1': ht_X&ft_1, 'X-X': ht_X&ft_X, 'X-2': ht_X&ft_2,
+        '2-1': ht_2&ft_1, '2-X': ht_2&ft_X, '2-2': ht_2&ft_2
+    }
+    indicators.update({f'over_{ng}': tot_goals > ng for ng in ACCEPTED_GOALS})
+    indicators.update({f'home_&over_{ng}': ft_1&(tot_goals > ng) for ng in ACCEPTED_GOALS})
+    indicators.update({f'home_&under_{ng}': ft_1&(tot_goals < ng) for ng in ACCEPTED_GOALS})
+    indicators.update({f'away_&over_{ng}': ft_2&(tot_goals > ng) for ng in ACCEPTED_GOALS})
+    indicators.update({f'away_&under_{ng}': ft_2&(tot_goals < ng) for ng in ACCEPTED_GOALS})
+    indicators.update({f'over_{ng}_btts_yes': (tot_goals > ng)&btts for ng in ACCEPTED_GOALS if ng > 1.5})
+    indicators.update({f'over_{ng}_btts_no': (tot_goals > ng)&~btts for ng in ACCEPTED_GOALS if ng > 1.5})
+    indicators.update({f'under_{ng}_btts_yes': (tot_goals < ng)&btts for ng in ACCEPTED_GOALS if ng > 1.5})
+    indicators.update({f'under_{ng}_btts_no': (tot_goals < ng)&~btts for ng in ACCEPTED_GOALS if ng > 1.5})
+
+    return indicators
+
+def _with_under_markets(markets, frequencies):
+    """ Returns the columns of 'frequencies' as a dict keyed by 'markets', with the under markets of total goals added
+        right after the over markets.
+    """
+    probabilities = {}
+    for j, market in enumerate(markets):
+        probabilities[market] = frequencies[:, j]
+        if market == f'over_{ACCEPTED_GOALS[-1]}':
+            probabilities.update({f'under_{ng}': 1 - probabilities[f'over_{ng}'] for ng in ACCEPTED_GOALS})
+
+    return probabilities
+
+class SimilarGamesIndex:
+    """Index of past games sorted by the points difference of the teams, with cumulative counts of every market outcome.
+       The games similar to a new one (those with points difference within +/- delta of its own) form a contiguous window
+       of the sorted games, so the number of times a market outcome happened among them is the difference of two
+       cumulative counts at window edges found with searchsorted.
+
+       Parameters:
+           'goals_given_points' - Table of past games with their goals and the teams' points difference.
+           'min_games'          - Windows with fewer games raise a warning. Windows lying entirely above the largest recorded
+                                  points difference fall back to the 'min_games' games with the largest points difference.
+    """
+    def __init__(self, goals_given_points=None, min_games=20):
+        self.min_games = min_games
+        if goals_given_points is None:
+            return
+
+        points_diff = goals_given_points.points_diff.values
+        # window bounds are compared in half precision against a float16 column, as the column itself would be
+        self.__half_precision = points_diff.dtype == np.float16
+
+        points_diff = points_diff.astype('float64')
+        positions = np.flatnonzero(~np.isnan(points_diff))
+        # among equal points differences, earlier games sort last - so the top games are the ones nlargest would pick
+        order = positions[np.lexsort((-positions, points_diff[positions]))]
+        self.points_diff = points_diff[order]
+
+        games = goals_given_points.iloc[order]
+        indicators = _market_indicators(*[games[c].values.astype('int64') for c in ['ft_home', 'ft_away', 'ht_home', 'ht_away']])
+        self.markets = list(indicators.keys())
+
+        self.__cumulative = np.zeros((len(order) + 1, len(self.markets)), dtype='int64')
+        np.cumsum(np.column_stack(list(indicators.values())), axis=0, out=self.__cumulative[1:])
+
+    @classmethod
+    def from_arrays(cls, arrays, min_games=20):
+        index = cls(min_games=min_games)
+        index.points_diff = arrays['points_diff']
+        index.markets = arrays['markets'].tolist()
+        index.__cumulative = arrays['cumulative_counts']
+        index.__half_precision = bool(arrays['half_precision'])
+        return index
+
+    def to_arrays(self):
+        return {'points_diff': self.points_diff,
+                'markets': np.array(self.markets),
+                'cumulative_counts': self.__cumulative,
+                'half_precision': np.array(self.__half_precision)}
+
+    def __len__(self):
+        return len(self.points_diff)
+
+    def windows(self, points_diffs, delta):
+        """ Returns the start and end positions of the similar games window of each of 'points_diffs'.
+        """
+        points_diffs = np.atleast_1d(points_diffs)
+        lower, upper = points_diffs - delta, points_diffs + delta
+        lower_bounds, upper_bounds = lower.astype('float64'), upper.astype('float64')
+        if self.__half_precision:
+            lower_bounds = lower.astype('float16').astype('float64')
+            upper_bounds = upper.astype('float16').astype('float64')
+
+        starts = np.searchsorted(self.points_diff, lower_bounds, side='left')
+        ends = np.searchsorted(self.points_diff, upper_bounds, side='right')
+
+        ngames = ends - starts
+        for i in np.flatnonzero(ngames < self.min_games):
+            if len(self) > 0 and lower[i] > self.points_diff[-1]:
+                starts[i], ends[i] = max(len(self) - self.min_games, 0), len(self)
+            elif ngames[i] > 0:
+                warnings.warn(f'Less than twenty games with points difference between {lower[i]} and ' +\
+                              f'{upper[i]} recorded. Perhaps you should increase delta_points_diff?')
+            else:
+                raise ValueError(f'No games with points difference between {lower[i]} and ' +\
+                                 f'{upper[i]} recorded. Perhaps you should increase delta_points_diff?')
+
+        return starts, ends
+
+    def probabilities(self, starts, ends):
+        """ Returns the frequency of every market outcome in the given windows, as a dict of arrays keyed by market.
+        """
+        ngames = (ends - starts)[:, None]
+        frequencies = (self.__cumulative[ends] - self.__cumulative[starts]) / ngames
+        return _with_under_markets(self.markets, frequencies)
@@ -0,0 +1,102 @@
+import numpy as np
+from collections import defaultdict
+
+class TeamStateCache:
+    """Keeps the GRU states that each team's games of a season led to, so that the numpy backend of RnnProbabilityEstimator
+       only feeds games through the networks that it has not seen yet. Every team and season holds one entry, identified
+       by the first and last game dates (and number of games) of the sequence it was computed on.
+
+       A sequence that extends the cached one - same first game, new games after its last one - starts from the cached
+       states and runs only the new games, so while a team has played fewer than n_timestep_games games of the season, a
+       new matchday costs one recurrent step per team. Once the team's window of games slides past the start of the
+       season its first game changes with every new game, and the states are computed over the whole window again.
+
+       Parameters:
+           'htft_model'        - NumpySequentialModel predicting half-time and full time goals.
+           'second_half_model' - NumpySequentialModel predicting second half goals given the half-time score.
+           'n_timestep_games'  - Number of timesteps the estimator pads sequences to.
+    """
+    def __init__(self, htft_model, second_half_model, n_timestep_games):
+        self.htft_model = htft_model
+        self.second_half_model = second_half_model
+        self.n_timestep_games = n_timestep_games
+        self.__entries = {}
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def clear(self):
+        self.__entries = {}
+
+    def predict(self, sequences, max_goals):
+        """ Returns the half-time/full time predictions (games, 4) and the second half predictions for every half-time
+            scoreline (games, max_goals, max_goals, 2) after the last game of each of 'sequences' - tuples of team id,
+            season, game features (games, features) and game dates.
+        """
+        scorelines = np.array([[hg, ag] for hg in range(max_goals) for ag in range(max_goals)], dtype='float64')
+
+        # start every sequence from the cached states it extends, if any, and group them by the number of games left to run
+        groups = defaultdict(list)
+        for idx, (team_id, season, features, dates) in enumerate(sequences):
+            start, htft_states, second_half_states = 0, None, None
+            entry = self.__entries.get((team_id, season)) if len(features) > 0 else None
+            if entry is not None and entry['max_goals'] == max_goals and 0 < entry['n_games'] <= len(features) and\
+                    dates[0] == entry['first_date'] and dates[entry['n_games'] - 1] == entry['last_date']:
+                start, htft_states, second_half_states = entry['n_games'], entry['htft_states'], entry['second_half_states']
+            # a team with no games before the predicted one is fed the zero padding, as with the keras backend
+            n_new_games = len(features) - start if len(features) > 0 else self.n_timestep_games
+            groups[n_new_games].append((idx, start, htft_states, second_half_states))
+
+        htft_states = [None] * len(sequences)
+        second_half_states = [None] * len(sequences)
+        for n_new_games, items in groups.items():
+            if n_new_games == 0:
+                new_htft_states = [states for _, _, states, _ in items]
+                new_second_half_states = [states for _, _, _, states in items]
+            else:
+                features = np.stack([sequences[idx][2][start:] if len(sequences[idx][2]) > 0 else\
+                                        np.zeros((n_new_games, sequences[idx][2].shape[1])) for idx, start, _, _ in items])
+                new_htft_states, new_second_half_states = self.__advance(features, items, scorelines)
+
+            for (idx, _, _, _), htft, second_half in zip(items, new_htft_states, new_second_half_states):
+                htft_states[idx], second_half_states[idx] = htft, second_half
+                self.__store(sequences[idx], htft, second_half, max_goals)
+
+        htft_predictions = self.htft_model.predict_from_states(np.stack(htft_states))
+        second_half_predictions = self.second_half_model.predict_from_states(np.stack(second_half_states))
+        return htft_predictions, second_half_predictions.reshape(len(sequences), max_goals, max_goals, -1)
+
+    def __advance(self, features, items, scorelines):
+        n, n_steps, n_features = features.shape
+        htft_units = self.htft_model.arrays['layer_0_recurrent_kernel'].shape[0]
+        second_half_units = self.second_half_model.arrays['layer_0_recurrent_kernel'].shape[0]
+
+        htft_states = np.stack([states if states is not None else np.zeros(htft_units) for _, _, states, _ in items])
+        htft_states = self.htft_model.advance_states(features, htft_states)
+
+        # every sequence runs once per half-time scoreline, all as one batch
+        inputs = np.concatenate([np.broadcast_to(features[:, None], (n, len(scorelines), n_steps, n_features)),
+                                 np.broadcast_to(scorelines[None, :, None, :], (n, len(scorelines), n_steps, 2))], axis=-1)
+        second_half_states = np.stack([states if states is not None else np.zeros((len(scorelines), second_half_units))\
+                                        for _, _, _, states in items])
+        second_half_states = self.second_half_model.advance_states(inputs.reshape(n * len(scorelines), n_steps, n_features + 2),
+                                                                   second_half_states.reshape(n * len(scorelines), -1))
+
+        return htft_states, second_half_states.reshape(n, len(scorelines), -1)
+
+    def __store(self, sequence, htft_states, second_half_states, max_goals):
+        team_id, season, features, dates = sequence
+        if len(features) == 0:
+            return
+
+        # keep the most recent sequence of every team and season
+        entry = self.__entries.get((team_id, season))
+        if entry is not None and entry['last_date'] > dates[-1]:
+            return
+
+        self.__entries[(team_id, season)] = {'first_date': dates[0],
+                                             'last_date': dates[-1],
+                                             'n_games': len(features),
+                                             'max_goals': max_goals,
+                                             'htft_states': htft_states,
+                                             'second_half_states': second_half_states}
@@ -0,0 +1,250 @@
+import os
+import json
+
+from selenium.common.exceptions import TimeoutException
+
+from driver import DriverWrapper
+from utils import PageNotLoadingError
+from constants import SNAPSHOTS_PATH
+
+_TAPE_FILE_NAME = 'tape.json'
+_REPLAYABLE_ERRORS = {
+    'TimeoutException': TimeoutException,
+    'PageNotLoadingError': PageNotLoadingError
+}
+
+def get_session_path(bookie_name, league_id, snapshots_path=SNAPSHOTS_PATH):
+    return os.path.join(snapshots_path, bookie_name, f'league_{league_id}')
+
+def recorded_league_ids(bookie_name, snapshots_path=SNAPSHOTS_PATH):
+    bookie_path = os.path.join(snapshots_path, bookie_name)
+    if not os.path.isdir(bookie_path):
+        return []
+
+    return sorted([int(d.replace('league_', '')) for d in os.listdir(bookie_path)\
+                        if os.path.isfile(os.path.join(bookie_path, d, _TAPE_FILE_NAME))])
+
+class _SnapshotTape:
+    """ Ordered record of everything a provider read from the driver while scraping a single league - page sources
+        (saved as separate html snapshots), urls, attribute values, element counts and the commands that failed.
+    """
+    def __init__(self, session_path):
+        self.session_path = session_path
+        self.events = []
+
+        os.makedirs(session_path, exist_ok=True)
+        for file_name in os.listdir(session_path):
+            if file_name.endswith('.html'):
+                os.remove(os.path.join(session_path, file_name))
+
+    def record(self, operation, command, *args):
+        try:
+            value = command(*args)
+        except Exception as exc:
+            self.events.append({'op': operation, 'error': type(exc).__name__, 'message': str(exc)})
+            raise
+
+        event = {'op': operation}
+        if operation == 'page_source':
+            event['value'] = f'page_{len(self.events):05d}.html'
+            with open(os.path.join(self.session_path, event['value']), 'w', encoding='utf-8') as fp:
+                fp.write(value)
+        elif operation == 'find_elements':
+            event['value'] = len(value)
+        elif operation in ['current_url', 'get_attribute']:
+            event['value'] = value
+
+        self.events.append(event)
+        return value
+
+    def save(self):
+        with open(os.path.join(self.session_path, _TAPE_FILE_NAME), 'w', encoding='utf-8') as fp:
+            json.dump(self.events, fp)
+
+class RecordingDriver:
+    """ Wraps a live Driver and saves a snapshot of every page state a provider parses, along with the rest of the
+        driver responses, so that the provider's scraping of each league can later be replayed offline by a ReplayDriver.
+
+        Example:
+            provider.set_driver(RecordingDriver(Driver(logger=logger)))
+            provider.update_odds_db()
+    """
+    def __init__(self, driver, snapshots_path=SNAPSHOTS_PATH):
+        self.__driver = driver
+        self.snapshots_path = snapshots_path
+        self.__tape = None
+
+    @property
+    def page_source(self): return self.__record('page_source', lambda: self.__driver.page_source);
+
+    @property
+    def current_url(self): return self.__record('current_url', lambda: self.__driver.current_url);
+
+    @property
+    def metrics(self): return self.__driver.metrics;
+
+    @metrics.setter
+    def metrics(self, value): self.__driver.metrics = value;
+
+    @property
+    def breaker(self): return self.__driver.breaker;
+
+    @breaker.setter
+    def breaker(self, value): self.__driver.breaker = value;
+
+    def back(self): self.__record('back', self.__driver.back);
+    def start(self): self.__driver.start();
+    def get(self, url): self.__record('get', self.__driver.get, url);
+    def refresh(self): self.__record('refresh', self.__driver.refresh);
+    def sleep(self, seconds): self.__driver.sleep(seconds);
+
+    def close(self):
+        self.save()
+        self.__driver.close()
+
+    def save(self):
+        if self.__tape is not None:
+            self.__tape.save()
+
+    def set_context(self, bookie_name, league_id):
+        self.save()
+        self.__tape = _SnapshotTape(get_session_path(bookie_name, league_id, self.snapshots_path))
+        self.__driver.set_context(bookie_name, league_id)
+
+    def find_element_by_class_name(self, class_name):
+        return _RecordingElement(self.__record('find_element', self.__driver.find_element_by_class_name, class_name), self.__tape)
+    def find_elements_by_class_name(self, class_name):
+        return _RecordingElement.wrap_group(self.__record('find_elements', self.__driver.find_elements_by_class_name, class_name), self.__tape)
+    def find_element_by_xpath(self, xpath):
+        return _RecordingElement(self.__record('find_element', self.__driver.find_element_by_xpath, xpath), self.__tape)
+    def find_elements_by_xpath(self, xpath):
+        return _RecordingElement.wrap_group(self.__record('find_elements', self.__driver.find_elements_by_xpath, xpath), self.__tape)
+
+    def wait_until_visibility(self, by, content):
+        self.__record('wait', self.__driver.wait_until_visibility, by, content)
+
+    def __record(self, operation, command, *args):
+        if self.__tape is None:
+            return command(*args)
+        return self.__tape.record(operation, command, *args)
+
+class _RecordingElement:
+    def __init__(self, element, tape):
+        self.__element = element
+        self.__tape = tape
+
+    @staticmethod
+    def wrap_group(elements, tape):
+        return [_RecordingElement(element, tape) for element in elements]
+
+    def click(self): self.__record('click', self.__element.click);
+    def get_attribute(self, attribute): return self.__record('get_attribute', self.__element.get_attribute, attribute);
+
+    def find_element_by_class_name(self, class_name):
+        return _RecordingElement(self.__record('find_element', self.__element.find_element_by_class_name, class_name), self.__tape)
+    def find_elements_by_class_name(self, class_name):
+        return self.wrap_group(self.__record('find_elements', self.__element.find_elements_by_class_name, class_name), self.__tape)
+    def find_element_by_xpath(self, xpath):
+        return _RecordingElement(self.__record('find_element', self.__element.find_element_by_xpath, xpath), self.__tape)
+    def find_elements_by_xpath(self, xpath):
+        return self.wrap_group(self.__record('find_elements', self.__element.find_elements_by_xpath, xpath), self.__tape)
+
+    def __record(self, operation, command, *args):
+        if self.__tape is None:
+            return command(*args)
+        return self.__tape.record(operation, command, *args)
+
+class ReplayDriver(DriverWrapper):
+    """ Offline implementation of the Driver interface. Serves the page snapshots and driver responses saved by a
+        RecordingDriver in the order they were recorded, so that odds providers can run their full parsing path without
+        a browser. Navigation commands and sleeps are no-ops.
+
+        Parameters:
+            'snapshots_path' - Directory the snapshots were recorded to.
+    """
+    def __init__(self, snapshots_path=SNAPSHOTS_PATH, logger=None):
+        super().__init__(max_trials=1, trial_wait_time=0)
+        self.snapshots_path = snapshots_path
+        self.logger = logger
+        self.context = None
+
+        self.pages_replayed = 0
+        self.__events = []
+        self.__pages = {}
+        self.__position = 0
+
+    @property
+    def page_source(self):
+        page = self.__pages[self._replay('page_source')]
+        self.pages_replayed += 1
+        return page
+
+    @property
+    def current_url(self): return self._replay('current_url');
+
+    def back(self): self._replay('back');
+    def start(self): pass;
+    def close(self): pass;
+    def get(self, url): self._replay('get');
+    def refresh(self): self._replay('refresh');
+    def sleep(self, seconds): pass;
+
+    def set_context(self, bookie_name, league_id):
+        session_path = get_session_path(bookie_name, league_id, self.snapshots_path)
+        tape_path = os.path.join(session_path, _TAPE_FILE_NAME)
+        if not os.path.isfile(tape_path):
+            raise PageNotLoadingError(f'No snapshots recorded for bookie {bookie_name} and league with id {league_id}.')
+
+        with open(tape_path, 'r', encoding='utf-8') as fp:
+            self.__events = json.load(fp)
+
+        self.__pages = {}
+        for event in self.__events:
+            if event['op'] == 'page_source' and 'error' not in event:
+                with open(os.path.join(session_path, event['value']), 'r', encoding='utf-8') as fp:
+                    self.__pages[event['value']] = fp.read()
+
+        self.__position = 0
+        self.context = (bookie_name, league_id)
+
+    def find_element_by_class_name(self, class_name): return _ReplayElement.find(self);
+    def find_elements_by_class_name(self, class_name): return _ReplayElement.find_group(self);
+    def find_element_by_xpath(self, xpath): return _ReplayElement.find(self);
+    def find_elements_by_xpath(self, xpath): return _ReplayElement.find_group(self);
+
+    def wait_until_visibility(self, by, content): self._replay('wait');
+
+    def _replay(self, operation):
+        if self.__position >= len(self.__events):
+            raise PageNotLoadingError(f'Snapshots for {self.context} exhausted - the provider requested \'{operation}\' after the end of the recording.')
+
+        event = self.__events[self.__position]
+        self.__position += 1
+        if event['op'] != operation:
+            raise PageNotLoadingError(f'Snapshots for {self.context} out of sync - recorded \'{event["op"]}\', but the provider requested \'{operation}\'.')
+
+        if 'error' in event:
+            raise _REPLAYABLE_ERRORS.get(event['error'], PageNotLoadingError)(event['message'])
+
+        return event.get('value')
+
+class _ReplayElement:
+    def __init__(self, replay_driver):
+        self.__driver = replay_driver
+
+    @staticmethod
+    def find(replay_driver):
+        replay_driver._replay('find_element')
+        return _ReplayElement(replay_driver)
+
+    @staticmethod
+    def find_group(replay_driver):
+        return [_ReplayElement(replay_driver) for _ in range(replay_driver._replay('find_elements'))]
+
+    def click(self): self.__driver._replay('click');
+    def get_attribute(self, attribute): return self.__driver._replay('get_attribute');
+
+    def find_element_by_class_name(self, class_name): return self.find(self.__driver);
+    def find_elements_by_class_name(self, class_name): return self.find_group(self.__driver);
+    def find_element_by_xpath(self, xpath): return self.find(self.__driver);
+    def find_elements_by_xpath(self, xpath): return self.find_group(self.__driver);
@@ -0,0 +1,105 @@
+import pytest
+
+pytest.importorskip('selenium')
+pytest.importorskip('pandas')
+pytest.importorskip('textdistance')
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+
+from driver import Driver, DriverWrapper
+from odds_providers.odds_provider import OddsProvider
+from utils import CircuitOpenError, ScrapeMetrics, BackoffPolicy, CircuitBreaker
+
+OPTIONAL_MARKET_XPATH = '//div[text()="Double Chance"]'
+
+class FakeWebdriver:
+    current_url = 'https://bookie.test/match'
+
+    def back(self): pass
+    def close(self): pass
+
+class MissingElementWaiter:
+    def __init__(self):
+        self.calls = 0
+
+    def until(self, condition):
+        self.calls += 1
+        raise TimeoutException()
+
+class FakeOddsProvider(OddsProvider):
+    """ Provider scraping 'n_matches' matches, none of which shows the optional market. Match number i fails to load
+        while 'failing(i)' is true.
+    """
+    def __init__(self, n_matches, failing=lambda i: False):
+        self.logger = None
+        self.max_trials = 3
+        self.metrics = ScrapeMetrics()
+        self.backoff = BackoffPolicy(0)
+        self.breaker = CircuitBreaker(failure_threshold=3)
+        self._teams_quick_map = {}
+        self.n_matches = n_matches
+        self.failing = failing
+
+    def _get_odds_link_items(self):
+        return range(self.n_matches)
+
+    def _get_team_id(self, team_name, league_id):
+        return team_name
+
+    def extract_match_odds(self, odds_item, close_driver = False):
+        if self.failing(odds_item):
+            raise ValueError(f'Match {odds_item} failed to load.')
+
+        game_dict = {'home_team': f'home {odds_item}', 'away_team': f'away {odds_item}'}
+        try:
+            self._driver.wait_until_visibility(By.XPATH, OPTIONAL_MARKET_XPATH)
+            game_dict['double_chance'] = 1.
+        except TimeoutException:
+            pass
+        return game_dict
+
+def make_driver():
+    driver = Driver.__new__(Driver)
+    DriverWrapper.__init__(driver, 3, 0)
+    driver.logger = None
+    driver._Driver__driver = FakeWebdriver()
+    driver._Driver__driver_waiter = MissingElementWaiter()
+    return driver
+
+def scrape_league(provider, league_id=0):
+    driver = make_driver()
+    provider.set_driver(driver)
+    provider.breaker.set_context('fake', league_id)
+    return provider._OddsProvider__extract_bookie_league_odds(league_id), driver._Driver__driver_waiter
+
+def test_league_scrapes_when_optional_market_circuit_opens():
+    provider = FakeOddsProvider(5)
+    games_odds, waiter = scrape_league(provider)
+
+    assert len(games_odds) == 5
+    assert all('double_chance' not in game for game in games_odds)
+    # the optional market's circuit opened after the third match, so the last two did not wait for it
+    assert waiter.calls == 3
+    assert provider.breaker.is_open(OPTIONAL_MARKET_XPATH)
+    assert not provider.breaker.is_open()
+
+def test_league_circuit_opens_within_run_when_matches_keep_failing():
+    provider = FakeOddsProvider(5, failing=lambda i: i >= 1)
+    with pytest.raises(CircuitOpenError):
+        scrape_league(provider)
+
+    assert provider.breaker.is_open()
+
+def test_league_circuit_stays_closed_on_sporadic_failures():
+    # every match fails on its first attempts only - successes in between reset the league's failure count
+    attempts = {}
+    def failing(i):
+        attempts[i] = attempts.get(i, 0) + 1
+        return attempts[i] < 3
+
+    provider = FakeOddsProvider(5, failing)
+    games_odds, _ = scrape_league(provider)
+
+    assert len(games_odds) == 5
+    assert not provider.breaker.is_open()
@@ -0,0 +1,79 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+pd = pytest.importorskip('pandas')
+
+from datetime import datetime, timedelta
+
+from probability_estimators.elo_ratings import EloRatingsProbabilityEstimator
+
+N_LEAGUES = 2
+TEAMS_PER_LEAGUE = 6
+
+class FakeFootballDataService:
+    def __init__(self, games):
+        self.games = games
+        self.leagues = pd.DataFrame({'league': [f'league {i}' for i in range(N_LEAGUES)], 'country': ['country'] * N_LEAGUES})
+
+    def date_to_season(self, date):
+        start_year = date.year if date.month >= 7 else date.year - 1
+        return str(start_year) + str(start_year + 1)
+
+    def provide_games(self, league_ids, start_date, end_date):
+        games = self.games[(self.games.league_id.isin(league_ids))&(self.games.date >= start_date)&(self.games.date <= end_date)]
+        return games[['league_id', 'home_team_id', 'away_team_id', 'date', 'season']]
+
+def make_games(seed=1):
+    # games are played in the current season, the only one an update resumes. With the default seed every team has
+    # played at home before the first half of the season ends
+    now = datetime.now()
+    start_year = now.year if now.month >= 7 else now.year - 1
+    rng = np.random.default_rng(seed)
+    rows = []
+    for league_id in range(N_LEAGUES):
+        team_ids = range(league_id * TEAMS_PER_LEAGUE, (league_id + 1) * TEAMS_PER_LEAGUE)
+        pairs = [(home, away) for home in team_ids for away in team_ids if home != away]
+        rng.shuffle(pairs)
+        for i, (home, away) in enumerate(pairs):
+            ht_home, ht_away = rng.poisson(0.7), rng.poisson(0.6)
+            rows.append({'ft_home': ht_home + rng.poisson(0.8), 'ft_away': ht_away + rng.poisson(0.6),
+                         'ht_home': ht_home, 'ht_away': ht_away,
+                         'date': datetime(start_year, 7, 1) + timedelta(days=3 * (i // (TEAMS_PER_LEAGUE // 2))),
+                         'league_id': league_id, 'season': int(f'{start_year}{start_year + 1}'), 'home_team_id': home, 'away_team_id': away})
+    return pd.DataFrame(rows).sort_values('date').reset_index(drop=True)
+
+@pytest.fixture
+def estimator(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    est = EloRatingsProbabilityEstimator
+    pd.DataFrame({'league_id': range(N_LEAGUES), 'starting_points': [1500, 1400]}).to_csv(est._LEAGUE_INIT_POINTS_CSV_PATH, index=False)
+    pd.DataFrame({'league_id': range(N_LEAGUES), 'expected_advantage': [60.5, 61.5], 'intercept': [0.3] * N_LEAGUES,
+                  'coef': [0.004] * N_LEAGUES}).to_csv(est._LEAGUE_MARGINS_CSV_PATH, index=False)
+    for _, (csv_path, dtypes) in est._HISTORY_TABLES.items():
+        pd.DataFrame([], columns=list(dtypes)).to_csv(csv_path, index=False)
+    pd.DataFrame([], columns=['team_id', 'home_delta', 'away_delta', 'home_t', 'away_t']).to_csv(est._TEAMS_FORM_CSV_PATH, index=False)
+
+    # ratings up to mid-season are stored by an earlier run, so the ratings history is not loaded by the next update
+    games = make_games()
+    earlier_run = est(FakeFootballDataService(games[games.date < games.date.median()]))
+    earlier_run.update_data()
+    earlier_run.compact()
+
+    return est(FakeFootballDataService(games))
+
+def test_compact_drops_computed_ratings_rows(estimator):
+    estimator.update_data()
+    assert len(estimator._EloRatingsProbabilityEstimator__computed_ratings_rows) > 0
+
+    estimator.compact()
+    assert estimator._EloRatingsProbabilityEstimator__computed_ratings_rows == []
+    assert estimator._EloRatingsProbabilityEstimator__teams_elo_score is None
+
+def test_ratings_history_loaded_after_update_keeps_computed_precision(estimator):
+    estimator.update_data()
+    current_ratings = estimator.current_ratings.set_index('team_id').sort_index()
+    ratings = estimator.ratings_at(current_ratings.date.max()).sort_index()
+
+    assert estimator._EloRatingsProbabilityEstimator__computed_ratings_rows == []
+    assert ratings.elo_rating.dtype == 'float64'
+    assert np.array_equal(ratings.elo_rating.values, current_ratings.elo_rating.values)
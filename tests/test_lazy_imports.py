@@ -0,0 +1,19 @@
+import os
+import sys
+import subprocess
+
+import pytest
+
+pytest.importorskip('numpy')
+pytest.importorskip('pandas')
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.mark.parametrize('statement', ['from probability_estimators import EloRatingsProbabilityEstimator',
+                                       'from probability_estimators import BookieAverageProbabilityEstimator'])
+def test_estimator_import_does_not_load_scraping_dependencies(statement):
+    # imported in a fresh interpreter, so modules loaded by other tests do not hide the ones the import pulls in
+    probe = f'import sys\n{statement}\nprint(sorted(m for m in ["bs4", "selenium", "textdistance"] if m in sys.modules))'
+    output = subprocess.run([sys.executable, '-c', probe], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+
+    assert output.stdout.strip() == '[]'
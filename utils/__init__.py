@@ -2,4 +2,8 @@ from .bookie_header_titles import ALTERNATIVE_TG, BTTS, DOUBLE_CHANCE, FIRST_HAL
 from .bookie_header_titles import HALF_TIME, HT_DOUBLE_CHANCE, HT_FT, RESULT_BTTS, RESULT_TG, SECOND_HALF_BTTS, TG_BTTS
 from .logger import Logger, Logging
 from .prediction_checker import PredictionChecker
-from .utilities import fix_unicode, odds_to_probabilities, PageNotLoadingError, OddsExtractionFailedError
\ No newline at end of file
+from .utilities import fix_unicode, odds_to_probabilities, PageNotLoadingError, OddsExtractionFailedError, CircuitOpenError
+from .scrape_metrics import ScrapeMetrics
+from .retry_policies import BackoffPolicy, CircuitBreaker
+from .partitioned_store import PartitionedTableStore
+from .lazy_imports import lazy_exports
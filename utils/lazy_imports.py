@@ -0,0 +1,25 @@
+import importlib
+
+def lazy_exports(package_name, exports):
+    """ Returns module level __getattr__ and __dir__ functions (PEP 562) for a package whose public names are imported
+        from their submodules on first access instead of when the package is imported. 'exports' maps every public name
+        to the submodule defining it, relative to the package.
+
+        Example (in a package's __init__.py):
+            __getattr__, __dir__ = lazy_exports(__name__, {'RnnProbabilityEstimator': '.rnn'})
+    """
+    module_globals = importlib.import_module(package_name).__dict__
+
+    def __getattr__(name):
+        if name not in exports:
+            raise AttributeError(f'module {package_name!r} has no attribute {name!r}')
+
+        value = getattr(importlib.import_module(exports[name], package_name), name)
+        # later lookups find the name directly, without going through __getattr__ again
+        module_globals[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(module_globals) | set(exports))
+
+    return __getattr__, __dir__
@@ -0,0 +1,117 @@
+import os
+import json
+import pandas as pd
+
+class PartitionedTableStore:
+    """ Append-only storage of a table, split into partitions (e.g. one per season). Every append writes only the new rows,
+        as pickled chunks in their partitions' directories, and records them in a manifest. Loading reads the chunks in the
+        order they were appended, so the table comes back with the same row order and dtypes it was written with.
+
+        Parameters:
+            'path'    - Directory of the store.
+            'columns' - Columns of the table, used when loading a store with no rows yet.
+
+        Example:
+            store = PartitionedTableStore(DB_PATH + 'elo_history/goals_given_points/')
+            store.append(new_rows, partitions=new_rows.season)
+            table = store.load()
+    """
+    _MANIFEST_FILE_NAME = 'manifest.json'
+
+    def __init__(self, path, columns=None):
+        self.path = path
+        self.columns = columns
+        self.__manifest = None
+
+    @property
+    def manifest(self):
+        if self.__manifest is None:
+            manifest_path = os.path.join(self.path, self._MANIFEST_FILE_NAME)
+            if os.path.isfile(manifest_path):
+                with open(manifest_path, 'r', encoding='utf-8') as fp:
+                    self.__manifest = json.load(fp)
+            else:
+                self.__manifest = {'columns': self.columns, 'chunks': []}
+        return self.__manifest
+
+    def exists(self):
+        return os.path.isfile(os.path.join(self.path, self._MANIFEST_FILE_NAME))
+
+    def partitions(self):
+        return list(dict.fromkeys(chunk['partition'] for chunk in self.manifest['chunks']))
+
+    def append(self, rows, partitions):
+        """ Appends 'rows' to the store. 'partitions' holds the partition key of every row - consecutive rows with the
+            same key are written as one chunk.
+        """
+        partitions = pd.Series(partitions).astype(str).values
+        if len(rows) != len(partitions):
+            raise ValueError('Every appended row must have a partition key.')
+
+        manifest = self.manifest
+        if manifest['columns'] is None:
+            manifest['columns'] = list(rows.columns)
+
+        run_starts = [i for i in range(len(partitions)) if i == 0 or partitions[i] != partitions[i - 1]] + [len(partitions)]
+        for start, end in zip(run_starts[:-1], run_starts[1:]):
+            partition = partitions[start]
+            chunk_file = self.__write_chunk(rows.iloc[start:end], partition)
+            manifest['chunks'].append({'partition': partition, 'file': chunk_file, 'rows': end - start})
+
+        if len(partitions) > 0 or not self.exists():
+            self.__save_manifest()
+
+    def compact(self):
+        """ Rewrites every partition stored in more than one chunk as a single chunk. The merged chunk takes the place of the
+            partition's first chunk, so rows keep their order as long as partitions were appended one after another.
+        """
+        chunks, replaced_files = [], []
+        for partition in self.partitions():
+            partition_chunks = [chunk for chunk in self.manifest['chunks'] if chunk['partition'] == partition]
+            if len(partition_chunks) == 1:
+                chunks.extend(partition_chunks)
+                continue
+
+            rows = self.load([partition])
+            chunks.append({'partition': partition, 'file': self.__write_chunk(rows, partition), 'rows': len(rows)})
+            replaced_files.extend(chunk['file'] for chunk in partition_chunks)
+
+        if len(replaced_files) == 0:
+            return
+
+        self.manifest['chunks'] = chunks
+        self.__save_manifest()
+        # merged chunks are only removed once the manifest no longer lists them
+        for chunk_file in replaced_files:
+            os.remove(os.path.join(self.path, chunk_file))
+
+    def load(self, partitions=None):
+        """ Returns the rows of all partitions (or only of 'partitions'), in the order they were appended.
+        """
+        partitions = None if partitions is None else [str(p) for p in partitions]
+        chunks = [pd.read_pickle(os.path.join(self.path, chunk['file'])) for chunk in self.manifest['chunks']\
+                        if partitions is None or chunk['partition'] in partitions]
+
+        if len(chunks) == 0:
+            return pd.DataFrame([], columns=self.manifest['columns'])
+        return pd.concat(chunks, ignore_index=True)
+
+    def __write_chunk(self, rows, partition):
+        os.makedirs(os.path.join(self.path, partition), exist_ok=True)
+
+        # chunk numbers are never reused, so compacted chunks cannot overwrite the ones they replace
+        chunk_number = self.manifest.get('next_chunk', len(self.manifest['chunks']))
+        self.manifest['next_chunk'] = chunk_number + 1
+
+        chunk_file = os.path.join(partition, f'chunk_{chunk_number:06d}.pkl')
+        rows.reset_index(drop=True).to_pickle(os.path.join(self.path, chunk_file))
+        return chunk_file
+
+    def __save_manifest(self):
+        os.makedirs(self.path, exist_ok=True)
+
+        # replace the manifest in a single step, so that an interrupted write never leaves a corrupt store behind
+        manifest_path = os.path.join(self.path, self._MANIFEST_FILE_NAME)
+        with open(manifest_path + '.tmp', 'w', encoding='utf-8') as fp:
+            json.dump(self.manifest, fp, indent=1)
+        os.replace(manifest_path + '.tmp', manifest_path)
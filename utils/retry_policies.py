@@ -0,0 +1,94 @@
+import os
+import json
+import random
+from datetime import datetime, timedelta
+
+class BackoffPolicy:
+    """ Exponential backoff with jitter for retrying driver commands. The wait before retry number 'trial' (zero-based)
+        is 'base_wait' * 'factor'^trial, capped at 'max_wait' and reduced by a random fraction of up to 'jitter', so that
+        retries of nested commands do not keep hitting a slow page at the same moments.
+    """
+    def __init__(self, base_wait, factor=2, max_wait=None, jitter=0.5):
+        if not 0 <= jitter <= 1:
+            raise ValueError('Backoff jitter must be between 0 and 1.')
+
+        self.base_wait = base_wait
+        self.factor = factor
+        self.max_wait = max_wait
+        self.jitter = jitter
+
+    def wait_time(self, trial):
+        wait = self.base_wait * self.factor ** trial
+        if self.max_wait is not None:
+            wait = min(wait, self.max_wait)
+        return wait * (1 - self.jitter * random.random())
+
+class CircuitBreaker:
+    """ Keeps count of consecutive failures per bookie, league and selector. Once a selector (or a whole league, when no
+        selector is given) fails 'failure_threshold' times in a row, its circuit opens and the commands using it fail at
+        once instead of waiting through their retries. After 'cooldown_hours' a single attempt is allowed again - a success
+        closes the circuit, a failure keeps it open for another cooldown. The state is saved to 'filepath', so it carries
+        over between runs.
+
+        Example:
+            breaker.set_context('bet365', 3)
+            if not breaker.is_open(xpath):
+                ...
+                breaker.record_failure(xpath)
+    """
+    def __init__(self, filepath=None, failure_threshold=3, cooldown_hours=12):
+        self.filepath = filepath
+        self.failure_threshold = failure_threshold
+        self.cooldown = timedelta(hours=cooldown_hours)
+
+        self.bookie_name = None
+        self.league_id = None
+        self.__state = {}
+        self.__load()
+
+    def set_context(self, bookie_name, league_id):
+        self.bookie_name = bookie_name
+        self.league_id = league_id
+
+    def is_open(self, selector=None):
+        state = self.__state.get(self.__key(selector))
+        if state is None or state['opened_at'] is None:
+            return False
+
+        # past the cooldown the circuit is half-open - the next attempt decides whether it closes again
+        return datetime.now() - state['opened_at'] < self.cooldown
+
+    def record_success(self, selector=None):
+        self.__state.pop(self.__key(selector), None)
+
+    def record_failure(self, selector=None):
+        state = self.__state.setdefault(self.__key(selector), {'failures': 0, 'opened_at': None})
+        state['failures'] += 1
+        if state['failures'] >= self.failure_threshold:
+            state['opened_at'] = datetime.now()
+
+    def open_circuits(self):
+        return [key for key, state in self.__state.items() if state['opened_at'] is not None]
+
+    def save(self):
+        if self.filepath is None:
+            return
+
+        records = [{'bookie': bookie, 'league_id': league_id, 'selector': selector, 'failures': state['failures'],
+                    'opened_at': None if state['opened_at'] is None else state['opened_at'].isoformat()}\
+                        for (bookie, league_id, selector), state in self.__state.items()]
+        with open(self.filepath, 'w', encoding='utf-8') as fp:
+            json.dump(records, fp, indent=1)
+
+    def __key(self, selector):
+        return (self.bookie_name, self.league_id, selector)
+
+    def __load(self):
+        if self.filepath is None or not os.path.isfile(self.filepath):
+            return
+
+        with open(self.filepath, 'r', encoding='utf-8') as fp:
+            for record in json.load(fp):
+                opened_at = None if record['opened_at'] is None else datetime.fromisoformat(record['opened_at'])
+                self.__state[(record['bookie'], record['league_id'], record['selector'])] = {'failures': record['failures'],
+                                                                                            'opened_at': opened_at}
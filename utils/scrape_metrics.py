@@ -0,0 +1,79 @@
+import os
+import time
+import pandas as pd
+from datetime import datetime
+
+from .logger import Logging
+
+class ScrapeMetrics:
+    """ Collects timings, retry counts and failures of scraping operations (page loads, waits, element finds, clicks,
+        fixed sleeps, match odds extraction), grouped by bookie, league, operation and target (url or selector).
+
+        Example:
+            metrics.set_context('bet365', 3)
+            start = time.perf_counter()
+            ...
+            metrics.record('wait_until_visibility', time.perf_counter() - start, target=xpath, retries=1)
+    """
+    _COLUMNS = ['bookie', 'league_id', 'operation', 'target', 'count', 'total_seconds', 'max_seconds', 'retries', 'failures']
+
+    def __init__(self):
+        self.bookie_name = None
+        self.league_id = None
+        self.__stats = {}
+
+    def set_context(self, bookie_name, league_id):
+        self.bookie_name = bookie_name
+        self.league_id = league_id
+
+    def record(self, operation, seconds, target=None, retries=0, failed=False):
+        key = (self.bookie_name, self.league_id, operation, target)
+        if key not in self.__stats:
+            self.__stats[key] = [0, 0., 0., 0, 0]
+
+        stats = self.__stats[key]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] = max(stats[2], seconds)
+        stats[3] += retries
+        stats[4] += int(failed)
+
+    def record_since(self, operation, start, target=None, retries=0, failed=False):
+        self.record(operation, time.perf_counter() - start, target, retries, failed)
+
+    def reset(self):
+        self.__stats = {}
+
+    def to_frame(self):
+        return pd.DataFrame([list(key) + stats for key, stats in self.__stats.items()], columns=self._COLUMNS)
+
+    def save(self, filepath):
+        """ Appends the collected stats to a csv file, stamped with the current time.
+        """
+        stats = self.to_frame()
+        stats.insert(0, 'run_date', datetime.now())
+        stats.to_csv(filepath, mode='a', header=not os.path.isfile(filepath), index=False)
+
+    def log(self, logger, n_slowest=5):
+        """ Logs the time spent per operation for every bookie and league, followed by the slowest targets and
+            the failing ones.
+        """
+        stats = self.to_frame()
+        if len(stats) == 0:
+            return
+
+        for (bookie, league_id), league_stats in stats.groupby(['bookie', 'league_id'], dropna=False):
+            by_operation = league_stats.groupby('operation')[['count', 'total_seconds', 'retries', 'failures']].sum()\
+                                       .sort_values('total_seconds', ascending=False)
+            summary = ', '.join([f'{op}: {row.total_seconds:.1f}s/{int(row["count"])} calls/{int(row.retries)} retries/{int(row.failures)} failed'\
+                                    for op, row in by_operation.iterrows()])
+            logger.log_message(f'Scrape timings for bookie {bookie}, league with id {league_id} - {summary}', Logging.INFO)
+
+        targeted = stats[~stats.target.isna()]
+        for _, row in targeted.nlargest(n_slowest, 'total_seconds').iterrows():
+            logger.log_message(f'Slow {row.operation} for bookie {row.bookie}, league with id {row.league_id}: ' +\
+                               f'{row.total_seconds:.1f}s in {row["count"]} calls (max {row.max_seconds:.1f}s) - {row.target}', Logging.INFO)
+
+        for _, row in targeted[targeted.failures > 0].sort_values('failures', ascending=False).iterrows():
+            logger.log_message(f'Failing {row.operation} for bookie {row.bookie}, league with id {row.league_id}: ' +\
+                               f'{row.failures} of {row["count"]} calls failed after {row.retries} retries - {row.target}', Logging.WARNING)
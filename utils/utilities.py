@@ -59,3 +59,7 @@ class PageNotLoadingError(Exception):
 class OddsExtractionFailedError(Exception):
     def __init__(self, message):
         super().__init__(message)
+
+class CircuitOpenError(PageNotLoadingError):
+    def __init__(self, message):
+        super().__init__(message)